@@ -1,92 +1,191 @@
+import os
 import requests
-from requests.auth import HTTPBasicAuth
-import urllib3
 import json
-
-# Suppress SSL warnings
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+import argparse
+import threading
+from catalyst_client import CatalystClient
+from counter_store import CounterStore
+from inventory import get_device_index, iter_devices
+from inventory_cache import InventoryCache
+from poller import Poller, INTERVALS
+from records import InterfaceRecord
+from snapshot_diff import SnapshotDiff, WATCHED, print_events
+from federation import load_controllers, connect, CONTROLLERS_PATH
+from exporter import InterfaceExporter, serve_exporter, EXPORTER_HOST, EXPORTER_PORT
 
 # Cisco DNA Center credentials and URL
-BASE_URL = "https://sandboxdnac2.cisco.com"
+# CATALYST_URL points the script elsewhere, e.g. at the local simulator.py
+BASE_URL = os.environ.get("CATALYST_URL", "https://sandboxdnac2.cisco.com")
 USERNAME = "devnetuser"
 PASSWORD = "Cisco123!"
 
-def get_token():
+def get_client():
     """
-    Fetches an authentication token from Cisco DNA Center.
+    Creates the shared Cisco DNA Center client and fetches its first token.
     """
-    url = f"{BASE_URL}/dna/system/api/v1/auth/token"
-    headers = {"Content-Type": "application/json"}
-    response = requests.post(url, auth=HTTPBasicAuth(USERNAME, PASSWORD), headers=headers, verify=False)
-    
-    if response.status_code == 200:
-        token = response.json()["Token"]
+    client = CatalystClient(BASE_URL, USERNAME, PASSWORD)
+    try:
+        client.get_token()
         print("Token fetched successfully.")
-        return token
-    else:
+    except requests.exceptions.HTTPError:
         print("Failed to retrieve token.")
-        response.raise_for_status()
+        raise
+    return client
 
-def get_device_id(device_name, token):
+def get_device_id(device_name, client):
     """
     Retrieves the device ID for a specific device based on its name.
     """
-    url = f"{BASE_URL}/dna/intent/api/v1/network-device"
-    headers = {
-        "Content-Type": "application/json",
-        "X-Auth-Token": token
-    }
-    response = requests.get(url, headers=headers, verify=False)
-    
-    if response.status_code == 200:
-        devices = response.json()["response"]
-        for device in devices:
-            if device["hostname"] == device_name:
-                print(f"Device ID for '{device_name}' found: {device['id']}")
-                return device["id"]
-        print(f"Device '{device_name}' not found.")
-    else:
+    try:
+        device_id = get_device_index(client).resolve(device_name)
+    except requests.exceptions.HTTPError:
         print("Failed to retrieve devices.")
-        response.raise_for_status()
-    return None
+        raise
+    if device_id:
+        print(f"Device ID for '{device_name}' found: {device_id}")
+    else:
+        print(f"Device '{device_name}' not found.")
+    return device_id
 
-def get_interface_stats(device_id, token):
+def get_interface_stats(device_id, client):
     """
     Fetches interface statistics for a given device ID.
     """
-    url = f"{BASE_URL}/dna/intent/api/v1/interface/network-device/{device_id}"
     #removed /interface to make it work. 
-    headers = {
-        "Content-Type": "application/json",
-        "X-Auth-Token": token
-    }
-    response = requests.get(url, headers=headers, verify=False)
-    
-    if response.status_code == 200:
-        interfaces = response.json()["response"]
-        print("Interface statistics retrieved successfully.")
-        return interfaces
-    else:
+    try:
+        interfaces = client.get_records(f"/dna/intent/api/v1/interface/network-device/{device_id}", record=InterfaceRecord)
+    except requests.exceptions.HTTPError as http_err:
         print("Failed to retrieve interface statistics.")
-        print("Status Code:", response.status_code)
-        print("Response Text:", response.text)  # <-- Added for debugging
-        response.raise_for_status()
+        print("Status Code:", http_err.response.status_code)
+        print("Response Text:", http_err.response.text)  # <-- Added for debugging
+        raise
+    print("Interface statistics retrieved successfully.")
+    return interfaces
+
+def make_pollers(client, on_result, intervals, clusters=None):
+    """
+    Returns one poller for the single controller, or one per cluster. Each
+    cluster poller uses that cluster's own client and tags its device
+    records with the cluster name, so a slow region only delays itself.
+    """
+    if not clusters:
+        return [Poller(client, on_result=on_result, intervals=intervals)]
+    return [
+        Poller(cluster.client, on_result=on_result, intervals=intervals,
+               list_devices=lambda cluster=cluster: cluster.tag(iter_devices(cluster.client)))
+        for cluster in clusters
+    ]
+
+def start_pollers(pollers, stop):
+    for poller in pollers:
+        threading.Thread(target=poller.run, args=(stop,), daemon=True).start()
+
+def run_daemon(client, intervals, clusters=None):
+    """
+    Polls every device continuously, each endpoint class on its own
+    jittered interval, until interrupted. Only changes are printed:
+    interface state transitions and new CRC errors.
+    """
+    store = CounterStore()
+    diff = SnapshotDiff()
+
+    def on_result(device, endpoint, result):
+        if endpoint == "errors":
+            store.record_poll(device["id"], result)
+        if endpoint in WATCHED:
+            name = device.get("hostname")
+            if device.get("cluster"):
+                name = f"{device.get('cluster')}/{name}"
+            print_events(diff.update(device["id"], endpoint, result), name)
+
+    stop = threading.Event()
+    start_pollers(make_pollers(client, on_result, intervals, clusters), stop)
+    print(f"Monitoring started, intervals: {intervals}")
+    try:
+        while not stop.wait(1):
+            pass
+    except KeyboardInterrupt:
+        print("Monitoring stopped.")
+    finally:
+        stop.set()
+
+def run_exporter(client, intervals, host=EXPORTER_HOST, port=EXPORTER_PORT, clusters=None):
+    """
+    Serves the latest interface status and error counters on /metrics for
+    Prometheus. The pollers refresh them in the background; scrapes never
+    reach the controller.
+    """
+    exporter = InterfaceExporter()
+    pollers = make_pollers(client, exporter.update, intervals, clusters)
+    stop = threading.Event()
+    start_pollers(pollers, stop)
+
+    def device_ids():
+        return [device_id for poller in pollers for device_id in list(poller.devices)]
+
+    threading.Thread(target=exporter.run_renderer, args=(stop, device_ids), daemon=True).start()
+
+    server = serve_exporter(exporter, host, port)
+    print(f"Exporter listening on http://{host}:{port}/metrics, intervals: {intervals}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Exporter stopped.")
+    finally:
+        stop.set()
+        server.server_close()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Catalyst Center interface monitoring.")
+    parser.add_argument("--daemon", action="store_true",
+                        help="keep running and poll all devices on per-endpoint schedules")
+    parser.add_argument("--exporter", action="store_true",
+                        help="poll like --daemon and serve the results as Prometheus metrics")
+    parser.add_argument("--exporter-host", default=EXPORTER_HOST,
+                        help=f"exporter listen address (default {EXPORTER_HOST})")
+    parser.add_argument("--exporter-port", type=int, default=EXPORTER_PORT,
+                        help=f"exporter listen port (default {EXPORTER_PORT})")
+    parser.add_argument("--controllers", metavar="FILE", default=CONTROLLERS_PATH,
+                        help="JSON list of controllers to poll in parallel in daemon and exporter mode (default $CATALYST_CONTROLLERS)")
+    for endpoint, interval in INTERVALS.items():
+        parser.add_argument(f"--{endpoint}-interval", type=int, default=interval, metavar="SECONDS",
+                            help=f"polling interval for {endpoint} in daemon and exporter mode (default {interval})")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
     # Replace 'YourDeviceHostname' with the actual hostname you want to query
     device_name = "switch2.ciscotest.com"
     
-    # Step 1: Get the authentication token
-    token = get_token()
+    intervals = {endpoint: getattr(args, f"{endpoint}_interval") for endpoint in INTERVALS}
+    if args.controllers and (args.exporter or args.daemon):
+        clusters = connect(load_controllers(args.controllers))
+        print(f"Polling {len(clusters)} controllers: {', '.join(cluster.name for cluster in clusters)}")
+        if args.exporter:
+            run_exporter(None, intervals, args.exporter_host, args.exporter_port, clusters)
+        else:
+            run_daemon(None, intervals, clusters)
+        return
+
+    # Step 1: Create the client and get the authentication token
+    client = get_client()
+    if args.exporter:
+        run_exporter(client, intervals, args.exporter_host, args.exporter_port)
+        return
+    if args.daemon:
+        run_daemon(client, intervals)
+        return
     
-    # Step 2: Retrieve the device ID for the specified device
-    device_id = get_device_id(device_name, token)
+    # Step 2: Retrieve the device ID, indexing the inventory through the on-disk cache
+    cache = InventoryCache()
+    get_device_index(client).build(cache.sync_devices(client))
+    device_id = get_device_id(device_name, client)
     if not device_id:
         print("Unable to find device, please check the device name.")
         return
 
     # Step 3: Retrieve interface statistics for the specified device
-    interfaces = get_interface_stats(device_id, token)
+    interfaces = get_interface_stats(device_id, client)
     if interfaces:
         print("\nInterface Statistics:")
         for interface in interfaces:
@@ -1,95 +1,71 @@
+import os
+import time
 import requests
-from requests.auth import HTTPBasicAuth
-import urllib3
-import matplotlib.pyplot as plt
-from tabulate import tabulate
-from datetime import datetime, timedelta
-
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+import argparse
+import sys
+from collections import deque
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from catalyst_client import CatalystClient, POOL_SIZE, RATE_LIMIT
+from counter_store import CounterStore, RATE_WINDOW
+from crc_ranking import fleet_top_crc, print_fleet_ranking, GROUPINGS, FEDERATED_GROUPINGS
+from federation import load_controllers, connect, merge, cluster_cache_path, CONTROLLERS_PATH
+from plot_render import PlotRenderer
+from report_output import open_report, FORMATS
+from metrics import METRICS
+from records import InterfaceRecord, ErrorRecord
+from inventory import iter_devices, iter_interfaces, group_interfaces, get_device_index
+from inventory_cache import InventoryCache, CACHE_MAX_AGE
+from usage_history import get_usage_history
 
 # Replace these with your own Cisco DNA Center credentials and URL
 USERNAME = 'devnetuser'
 PASSWORD = 'Cisco123!'
-BASE_URL = 'https://sandboxdnac2.cisco.com'
+# CATALYST_URL points the script elsewhere, e.g. at the local simulator.py
+BASE_URL = os.environ.get("CATALYST_URL", 'https://sandboxdnac2.cisco.com')
+
+# Sweep tuning: number of devices fetched in parallel
+MAX_WORKERS = 16
+# Idle days before an access port is reported as unused
+UNUSED_DAYS = 30
 
-def get_token():
+def get_client(pool_size=POOL_SIZE, rate=RATE_LIMIT):
     """
-    Authenticates with Cisco DNA Center and retrieves an authentication token.
+    Creates the shared Cisco DNA Center client (pooled session, cached token).
     """
-    url = f"{BASE_URL}/dna/system/api/v1/auth/token"
-    headers = {
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
-    response = requests.post(url, auth=HTTPBasicAuth(USERNAME, PASSWORD), headers=headers, verify=False)
-    response.raise_for_status()
-    token = response.json()["Token"]
-    return token
+    client = CatalystClient(BASE_URL, USERNAME, PASSWORD, pool_size=pool_size, rate=rate)
+    client.get_token()
+    return client
 
-def get_device_id(device_name, token):
+def get_device_id(device_name, client):
     """
     Fetches the device ID based on the device name.
     """
-    url = f"{BASE_URL}/dna/intent/api/v1/network-device"
-    headers = {
-        "Content-Type": "application/json",
-        "X-Auth-Token": token
-    }
-    response = requests.get(url, headers=headers, verify=False)
-    response.raise_for_status()
-
-    devices = response.json()["response"]
-    for device in devices:
-        if device["hostname"] == device_name:
-            return device["id"]
-    return None
+    return get_device_index(client).resolve(device_name)
 
 #new function, gets all the devices instead of just one hehe. 
-def get_all_devices(token):
+def get_all_devices(client, cache=None, max_age=CACHE_MAX_AGE):
     """
-    Fetches all device IDs and hostnames in the DNA Center.
+    Yields all device IDs and hostnames in the DNA Center, page by page.
+    With a cache the inventory is synced through it (or served from disk).
     """
-    url = f"{BASE_URL}/dna/intent/api/v1/network-device"
-    headers = {
-        "Content-Type": "application/json",
-        "X-Auth-Token": token
-    }
-    response = requests.get(url, headers=headers, verify=False)
-    response.raise_for_status()
-
-    devices = response.json()["response"]
-    return [(device["id"], device["hostname"]) for device in devices]
+    devices = iter_devices(client) if cache is None else cache.sync_devices(client, max_age)
+    for device in devices:
+        yield device["id"], device["hostname"]
 
 #jobbar här.
-def get_interface_stats(device_id, token):
+def get_interface_stats(device_id, client):
     """
     Fetches interface details for a given device ID.
     """
-    url = f"{BASE_URL}/dna/intent/api/v1/interface/network-device/{device_id}"
-    headers = {
-        "Content-Type": "application/json",
-        "X-Auth-Token": token
-    }
-    response = requests.get(url, headers=headers, verify=False)
-    response.raise_for_status()
-
-    interfaces = response.json()["response"]
-    return interfaces
-
-def get_interface_errors(device_id, token):
-    url = f"{BASE_URL}/dna/intent/api/v1/interface/network-device/{device_id}/errors"
-    headers = {
-        "Content-Type": "application/json",
-        "X-Auth-Token": token
-    }
-    response = requests.get(url, headers=headers, verify=False)
-    
-    if response.status_code == 200:
-        return response.json()["response"]
-    #return response.json().get("response", [])
-    else:
+    return client.get_records(f"/dna/intent/api/v1/interface/network-device/{device_id}", record=InterfaceRecord)
+
+def get_interface_errors(device_id, client):
+    try:
+        return client.get_records(f"/dna/intent/api/v1/interface/network-device/{device_id}/errors", record=ErrorRecord)
+    except requests.exceptions.HTTPError:
         print("Failed to retrieve interface error statistics.")
-        response.raise_for_status()
+        raise
 
 def display_top_crc_errors(errors_data, top_n=10):
     # Filter out interfaces with CRC errors
@@ -112,19 +88,37 @@ def display_top_crc_errors(errors_data, top_n=10):
 
     return [interface["portName"] for interface in crc_errors_sorted[:top_n]], [interface["crcErrors"] for interface in crc_errors_sorted[:top_n]]
 
-def plot_crc_errors(port_names, crc_counts):
+def display_top_crc_rates(store, device_id, top_n=10):
+    """
+    Ranks a device's interfaces by their recent CRC error rate from the
+    counter store. Returns None until the device has been polled twice.
+    """
+    rates = store.top_rates(top_n, device_id=device_id)
+    if rates is None:
+        return None
+
+    print(f"\nTop {top_n} Interfaces by CRC Error Rate (last {RATE_WINDOW // 3600}h):")
+    for _, port_name, delta, rate in rates:
+        print(f"Interface {port_name}: {rate:.1f} CRC errors/h ({delta} new)")
+
+    return [row[1] for row in rates], [row[3] for row in rates]
+
+def plot_crc_errors(port_names, crc_counts, ylabel='CRC Error Count'):
     if not port_names:
         print("No CRC errors to plot.")
         return
+    # Imported on first use: matplotlib dominates startup time otherwise
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 5))
     plt.bar(port_names, crc_counts, color='blue')
     plt.xlabel('Interface Port Names')
-    plt.ylabel('CRC Error Count')
+    plt.ylabel(ylabel)
     plt.title('Top 10 Interfaces with CRC Errors')
     plt.xticks(rotation=45)
     plt.tight_layout()
     plt.show()
 def print_interfaces_table(interfaces):
+    from tabulate import tabulate
     table = []
     headers = ["Port Name", "Status", "Admin Status", "MAC Address", "Speed", "Duplex", "MTU", "VLAN ID", "IP Address", "IP Mask"]
     for interface in interfaces:
@@ -145,69 +139,469 @@ def print_interfaces_table(interfaces):
 
 
 
-def get_interface_usage(device_id, interface_id, token):
-    #test of fake data:
+def get_interface_usage(device_id, interface_id, client):
+    """
+    Returns the last 30 days of usage samples for an interface. History is
+    fetched in daily windows in parallel and cached on disk, so only windows
+    that are new since the last run go to the controller.
+    """
+    try:
+        return get_usage_history(client).fetch(interface_id)
+    except requests.exceptions.HTTPError as http_err:
+        print(f"Failed to retrieve interface usage statistics: {http_err}")
+        return None
 
-    # Set the date range to the last 30 days
-    end_time = datetime.utcnow()
-    start_time = end_time - timedelta(days=30)    
-    url = f"{BASE_URL}/dna/intent/api/v1/interface/{interface_id}/statistics"
-    headers = {
-        "Content-Type": "application/json",
-        "X-Auth-Token": token
-    }
+def get_bulk_interfaces(client):
+    """
+    Loads the interfaces of the whole fleet from the global interface
+    listing (a few large pages) and groups them by device ID.
+    """
+    print("Loading interfaces in bulk...", file=sys.stderr)
+    bulk = group_interfaces(iter_interfaces(client))
+    print(f"Loaded interfaces of {len(bulk)} devices.", file=sys.stderr)
+    return bulk
 
-    params = {
-        "startTime": int(start_time.timestamp() * 1000),  # Convert to milliseconds
-        "endTime": int(end_time.timestamp() * 1000)
-    }
-    
-    response = requests.get(url, headers=headers, params=params, verify=False)
-    
-    if response.status_code == 200:
-        return response.json()["response"]
-    elif response.status_code == 404:
-        print(f"No usage data available for interface {interface_id}. It may be unsupported in the lab environment.")
-        return None
+def collect_interfaces(device_id, client, cache=None, bulk=None):
+    """
+    Fetches interface details for one device.
+    Interfaces come from the bulk listing if given, else they are fetched
+    live; status, admin status, speed and duplex change without touching
+    the device's stamp, so the cache is not used here. Devices missing from
+    the bulk listing (e.g. added during the sweep) are fetched one by one.
+    """
+    if bulk is not None and device_id in bulk:
+        return bulk[device_id]
+    return get_interface_stats(device_id, client)
+
+def collect_device(device_id, client, cache=None, bulk=None):
+    """
+    Fetches interface details and error counters for one device.
+    """
+    interfaces = collect_interfaces(device_id, client, cache, bulk)
+    errors_data = get_interface_errors(device_id, client)
+    return interfaces, errors_data
+
+def collect_report(device_id, client, cache=None, bulk=None):
+    """
+    Fetches everything a per-device report needs: interface details, error
+    counters and the 30-day usage samples of every interface, all on the
+    sweep's worker thread.
+    """
+    interfaces, errors_data = collect_device(device_id, client, cache, bulk)
+    usage = [
+        (interface.get("portName", "N/A"), get_interface_usage(device_id, interface["id"], client))
+        for interface in interfaces
+    ]
+    return interfaces, errors_data, usage
+
+def collect_usage(device_id, client, cache=None, bulk=None):
+    """
+    Fetches the interfaces of one device and their 30-day usage samples.
+    Only interface IDs, names and port modes are used, so cached interface
+    metadata will do.
+    """
+    if bulk is None and cache is not None:
+        interfaces = cache.get_interfaces(device_id, lambda device_id: get_interface_stats(device_id, client))
     else:
-        print("Failed to retrieve interface usage statistics.")
-        return None
+        interfaces = collect_interfaces(device_id, client, cache, bulk)
+    return [(interface, get_interface_usage(device_id, interface["id"], client)) for interface in interfaces]
+
+def collect_error_counters(device_id, client, cache=None, store=None):
+    """
+    Streams the error counters of one device into the counter store as the
+    response arrives and returns only the interfaces with CRC errors, so an
+    errors sweep never holds a device's full listing.
+    """
+    erroring = []
+
+    def counters():
+        for interface in client.iter_records(
+                f"/dna/intent/api/v1/interface/network-device/{device_id}/errors", record=ErrorRecord):
+            if (interface.get("crcErrors") or 0) > 0:
+                erroring.append(interface)
+            yield interface
+
+    store.record_poll(device_id, counters())
+    return erroring
+
+def collect_usage_report(device_id, client, cache=None, bulk=None, end_time=None):
+    """
+    Fetches the 30-day usage of one device's ports and reduces it to
+    per-port statistics on the worker, so a fleet sweep never holds raw
+    samples. Returns (interfaces, analyze_usage() report keyed by port name).
+    """
+    from port_usage import build_usage_matrix, analyze_usage
+    usage = collect_usage(device_id, client, cache, bulk)
+    interfaces = [interface for interface, _ in usage]
+    matrix = build_usage_matrix(
+        ((interface.get("portName", "N/A"), samples) for interface, samples in usage), end_time
+    )
+    return interfaces, analyze_usage(matrix)
+
+def sweep_devices(devices, client, max_workers=MAX_WORKERS, cache=None, collect=collect_device):
+    """
+    Runs collect(device_id, client, cache) for all devices over a bounded
+    worker pool and yields (device_id, device_name, result, error) in
+    inventory order. A failing device yields its error instead of aborting
+    the sweep. Devices are submitted as the inventory streams in, so
+    finished devices are reported before the inventory walk is complete.
+    """
+    def result_of(entry):
+        device_id, device_name, future = entry
+        try:
+            return device_id, device_name, future.result(), None
+        except Exception as err:
+            return device_id, device_name, None, err
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        pending = deque()
+        for device_id, device_name in devices:
+            pending.append((device_id, device_name, executor.submit(collect, device_id, client, cache)))
+            while pending and pending[0][2].done():
+                yield result_of(pending.popleft())
+        while pending:
+            yield result_of(pending.popleft())
+
+def report_device(device_id, device_name, interfaces, errors_data, usage, store, renderer=None):
+    """
+    Prints the interface table and CRC summary for one device.
+    With a renderer the CRC chart is written to a file instead of shown.
+    """
+    def plot(port_names, crc_counts, ylabel='CRC Error Count'):
+        if renderer is None:
+            plot_crc_errors(port_names, crc_counts, ylabel)
+        else:
+            renderer.plot_crc(device_name, port_names, crc_counts, ylabel)
+
+    print(f"Interfaces for device '{device_name}':")
+    with METRICS.phase("render"):
+        print_interfaces_table(interfaces)
+
+    # CRC error check and plot, ranked by recent rate once history exists
+    with METRICS.phase("analyze"):
+        store.record_poll(device_id, errors_data)
+        ranking = display_top_crc_rates(store, device_id)
+        if ranking is None:
+            ranking = display_top_crc_errors(errors_data)
+            ylabel = 'CRC Error Count'
+        else:
+            ylabel = 'CRC Errors per Hour'
+    with METRICS.phase("render"):
+        plot(*ranking, ylabel=ylabel)
+
+    # Interface usage check over the last 30 days (NumPy is loaded only here)
+    from port_usage import build_usage_matrix, analyze_usage, print_port_usage
+    with METRICS.phase("analyze"):
+        report = analyze_usage(build_usage_matrix(usage))
+    print_port_usage(report)
+
+def anomaly_report(cache, args):
+    """
+    Flags interfaces whose recent CRC error rate is far above their own
+    history in the counter store. Needs no controller access.
+    """
+    from crc_anomaly import detect_anomalies, print_anomalies
+
+    with METRICS.phase("analyze"):
+        anomalies = detect_anomalies(method=args.anomaly_method, workers=args.anomaly_workers)
+    if anomalies is None:
+        print("No counter history yet; poll the fleet (e.g. with --fleet-top or the monitoring daemon) first.")
+        return
+    hostnames = {}
+    if cache is not None:
+        hostnames = {device["id"]: device.get("hostname") for device in cache.load_devices()}
+    print_anomalies(anomalies, hostnames)
+
+def federated(clusters, args, work):
+    """
+    Runs work(cluster, cache) for every controller cluster concurrently,
+    each with its own inventory cache, and yields the merged items as they
+    arrive. A failing cluster is reported and skipped.
+    """
+    def run(cluster):
+        cache = None if args.no_cache else InventoryCache(cluster_cache_path(cluster.name))
+        return work(cluster, cache)
+
+    for cluster, item, error in merge(clusters, run):
+        if error is not None:
+            print(f"Controller '{cluster.name}' failed: {error}", file=sys.stderr)
+            continue
+        yield item
+
+def error_records(client, cache, store, args, cluster=None):
+    """
+    Yields (device, interface) for every interface with CRC errors on one
+    controller. Each device's counters are recorded in the counter store by
+    the worker that fetched them.
+    """
+    devices = {}
+
+    def device_pairs():
+        inventory = iter_devices(client) if cache is None else cache.sync_devices(client, args.cache_max_age)
+        if cluster is not None:
+            inventory = cluster.tag(inventory)
+        for device in inventory:
+            devices[device["id"]] = device
+            yield device["id"], device["hostname"]
+
+    def records():
+        for device_id, device_name, errors_data, error in sweep_devices(
+                device_pairs(), client, args.workers, cache, collect=partial(collect_error_counters, store=store)):
+            device = devices.pop(device_id)
+            if error is not None:
+                print(f"Skipping device '{device_name}': {error}")
+                continue
+            for interface in errors_data:
+                yield device, interface
+
+    return records()
+
+def fleet_crc_report(client, cache, store, args, clusters=None):
+    """
+    Streams error counters of every device into one fleet-wide top-N
+    ranking (plus per-site and per-family rankings) instead of per-device
+    reports. Interfaces are ranked by their recent CRC error rate from the
+    counter store, or by absolute counters while there is no history yet. With clusters, all controllers are swept in parallel into one
+    ranking, which is also broken down per cluster.
+    """
+    if clusters:
+        records = federated(clusters, args, lambda cluster, cache: error_records(
+            cluster.client, cache, store, args, cluster))
+        groupings = FEDERATED_GROUPINGS
+    else:
+        records = error_records(client, cache, store, args)
+        groupings = GROUPINGS
+
+    devices = {}
+
+    def tracked(records):
+        for device, interface in records:
+            devices[device["id"]] = device
+            yield device, interface
+
+    ranking = fleet_top_crc(tracked(records), args.fleet_top, groupings)
+    # Once polls have history, rank by recent rate: absolute counters put
+    # ports that errored months ago above ports erroring now
+    has_rates = False
+
+    def rates():
+        nonlocal has_rates
+        for device_id, port_name, _, rate in store.iter_rates():
+            if device_id in devices:
+                has_rates = True
+                yield devices[device_id], {"portName": port_name, "rate": rate}
+
+    with METRICS.phase("analyze"):
+        rate_ranking = fleet_top_crc(rates(), args.fleet_top, groupings, value=lambda interface: interface["rate"])
+    if has_rates:
+        ranking = rate_ranking
+        if not ranking["global"]:
+            print(f"No new CRC errors in the fleet over the last {RATE_WINDOW // 3600}h.")
+            return
+        print_fleet_ranking(ranking, args.fleet_top, per_hour=True)
+        return
+    if not ranking["global"]:
+        print("No CRC errors found in the fleet.")
+        return
+    print_fleet_ranking(ranking, args.fleet_top)
+
+def unused_ports_report(client, cache, args, bulk=None):
+    """
+    Collects 30-day usage for every port in the fleet and lists the access
+    ports that saw no traffic. Each device's ports are reduced to their
+    statistics on the worker that fetched them.
+    """
+    from port_usage import concat_reports, unused_ports, ports_without_data
+    reports, interfaces = [], {}
+    # One window for every device, so the per-device reports line up
+    end_time = time.time()
+    devices = get_all_devices(client, cache, args.cache_max_age)
+    for device_id, device_name, result, error in sweep_devices(
+            devices, client, args.workers, cache,
+            collect=partial(collect_usage_report, bulk=bulk, end_time=end_time)):
+        if error is not None:
+            print(f"Skipping device '{device_name}': {error}")
+            continue
+        device_interfaces, report = result
+        report["keys"] = [(device_name, port_name) for port_name in report["keys"]]
+        for key, interface in zip(report["keys"], device_interfaces):
+            interfaces[key] = interface
+        reports.append(report)
+
+    with METRICS.phase("analyze"):
+        report = concat_reports(reports)
+        unused = unused_ports(report, interfaces, args.unused_days)
+        no_data = ports_without_data(report)
+    print(f"\n{len(unused)} of {len(report['keys'])} ports are access ports unused for the last {args.unused_days} days:")
+    for device_name, port_name in unused:
+        print(f"{device_name} {port_name}")
+    if no_data:
+        print(f"\n{len(no_data)} port(s) have no usage data and were not checked:")
+        for device_name, port_name in no_data:
+            print(f"{device_name} {port_name}")
+
+def interface_batches(client, cache, args, bulk=None, cluster=None):
+    """
+    Yields (cluster name, device name, interfaces) for every device of one controller.
+    """
+    devices = get_all_devices(client, cache, args.cache_max_age)
+    for device_id, device_name, interfaces, error in sweep_devices(
+            devices, client, args.workers, cache, collect=partial(collect_interfaces, bulk=bulk)):
+        if error is not None:
+            print(f"Skipping device '{device_name}': {error}", file=sys.stderr)
+            continue
+        yield cluster and cluster.name, device_name, interfaces or []
+
+def dump_interfaces(client, cache, args, bulk=None, clusters=None):
+    """
+    Streams every interface in the fleet to stdout (or --output) one row at
+    a time as CSV, NDJSON or fixed-width text. Memory use does not grow
+    with the fleet; errors go to stderr so they never mix with the data.
+    With clusters, all controllers are swept in parallel and each row is
+    tagged with its cluster.
+    """
+    if clusters:
+        def work(cluster, cache):
+            bulk = get_bulk_interfaces(cluster.client) if args.bulk else None
+            return interface_batches(cluster.client, cache, args, bulk, cluster)
+        batches = federated(clusters, args, work)
+    else:
+        batches = interface_batches(client, cache, args, bulk)
+
+    stream = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        report = open_report(args.format, stream, cluster=bool(clusters))
+        for cluster_name, device_name, interfaces in batches:
+            with METRICS.phase("render"):
+                for interface in interfaces:
+                    report.write(device_name, interface, cluster_name)
+                stream.flush()
+    finally:
+        if args.output:
+            stream.close()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sweep all Catalyst Center devices.")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                        help=f"number of devices fetched in parallel (default {MAX_WORKERS}, 1 = sequential)")
+    parser.add_argument("--rate-limit", type=float, default=RATE_LIMIT,
+                        help="cap on requests per second to the controller (default $CATALYST_RATE_LIMIT or 0 = "
+                             "no cap, concurrency adapts to the controller's push back)")
+    parser.add_argument("--cache-max-age", type=int, default=CACHE_MAX_AGE,
+                        help=f"serve the device list from the on-disk cache if synced within this many seconds (default {CACHE_MAX_AGE}, 0 = always resync)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="bypass the on-disk inventory cache")
+    parser.add_argument("--fleet-top", type=int, metavar="N",
+                        help="print one fleet-wide top N CRC ranking (with per-site and per-family groups) instead of per-device reports")
+    parser.add_argument("--format", choices=FORMATS,
+                        help="stream all interfaces of the fleet in this format instead of per-device reports")
+    parser.add_argument("--output", metavar="FILE",
+                        help="write the --format stream to FILE instead of stdout")
+    parser.add_argument("--plots-dir", metavar="DIR",
+                        help="render CRC plots headless into DIR (in parallel) instead of opening a window per device")
+    parser.add_argument("--plot-format", choices=["png", "svg"], default="png",
+                        help="image format for --plots-dir (default png)")
+    parser.add_argument("--dashboard", action="store_true",
+                        help="with --plots-dir, write one multi-panel fleet dashboard instead of one image per device")
+    parser.add_argument("--unused-ports", action="store_true",
+                        help="list access ports without traffic across the whole fleet instead of per-device reports")
+    parser.add_argument("--unused-days", type=int, default=UNUSED_DAYS,
+                        help=f"idle days before an access port counts as unused (default {UNUSED_DAYS})")
+    parser.add_argument("--bulk", action="store_true",
+                        help="load all interfaces from the global interface listing in a few large pages instead of one request per device")
+    parser.add_argument("--controllers", metavar="FILE",
+                        help="JSON list of controllers to sweep in parallel as one fleet (with --fleet-top or --format; default $CATALYST_CONTROLLERS in those modes)")
+    parser.add_argument("--anomalies", action="store_true",
+                        help="flag interfaces whose CRC error rate deviates from their own counter history instead of per-device reports (no controller access)")
+    parser.add_argument("--anomaly-method", choices=["robust", "ewma"], default="robust",
+                        help="baseline for --anomalies: median/MAD robust z-score or EWMA (default robust)")
+    parser.add_argument("--anomaly-workers", type=int,
+                        help="processes scoring --anomalies shards (default: one per CPU)")
+    parser.add_argument("--metrics", action="store_true",
+                        help="time requests per endpoint and each phase, and print a summary to stderr at the end")
+    args = parser.parse_args()
+    federated_mode = bool(args.fleet_top or args.format) and not args.anomalies
+    if args.controllers and not federated_mode:
+        parser.error("--controllers works with --fleet-top or --format")
+    # The environment default only applies where federation is supported, so
+    # exporting it for the daemon does not break the other modes
+    if args.controllers is None and federated_mode:
+        args.controllers = CONTROLLERS_PATH
+    return args
 
 def main():
-    token = get_token()
-    print("Token fetched successfully.")
+    args = parse_args()
+    if args.metrics:
+        METRICS.enable()
+    try:
+        run(args)
+    finally:
+        if args.metrics:
+            print("\n" + METRICS.summary(), file=sys.stderr)
+
+def run_federated(args):
+    clusters = connect(load_controllers(args.controllers), pool_size=max(POOL_SIZE, args.workers), rate=args.rate_limit)
+    print(f"Sweeping {len(clusters)} controllers: {', '.join(cluster.name for cluster in clusters)}", file=sys.stderr)
+    try:
+        if args.format:
+            dump_interfaces(None, None, args, clusters=clusters)
+        else:
+            fleet_crc_report(None, None, CounterStore(), args, clusters)
+    finally:
+        for cluster in clusters:
+            cluster.close()
+
+def run(args):
+    if args.anomalies:
+        anomaly_report(None if args.no_cache else InventoryCache(), args)
+        return
+    if args.controllers:
+        run_federated(args)
+        return
+    client = get_client(pool_size=max(POOL_SIZE, args.workers), rate=args.rate_limit)
+    # Keep stdout clean for streamed reports
+    print("Token fetched successfully.", file=sys.stderr if args.format else sys.stdout)
     
-    devices = get_all_devices(token)
-    if not devices:
-        print("No devices found.")
+    cache = None if args.no_cache else InventoryCache()
+    # The fleet CRC ranking only needs error counters, not interfaces
+    bulk = get_bulk_interfaces(client) if args.bulk and not args.fleet_top else None
+    if args.format:
+        dump_interfaces(client, cache, args, bulk)
         return
+    store = CounterStore()
+    if args.fleet_top:
+        fleet_crc_report(client, cache, store, args)
+        return
+    if args.unused_ports:
+        unused_ports_report(client, cache, args, bulk)
+        return
+
+    renderer = None
+    if args.plots_dir:
+        renderer = PlotRenderer(args.plots_dir, args.plot_format, dashboard=args.dashboard)
+    devices = get_all_devices(client, cache, args.cache_max_age)
+    device_count = 0
     
-    for device_id, device_name in devices:
+    for device_id, device_name, result, error in sweep_devices(
+            devices, client, args.workers, cache, collect=partial(collect_report, bulk=bulk)):
+        device_count += 1
         print(f"\n--- Processing device '{device_name}' ---")
         try:
-            interfaces = get_interface_stats(device_id, token)
-            print(f"Interfaces for device '{device_name}':")
-            print_interfaces_table(interfaces)
-            
-            # CRC error check and plot
-            errors_data = get_interface_errors(device_id, token)
-            port_names, crc_counts = display_top_crc_errors(errors_data)
-            plot_crc_errors(port_names, crc_counts)
-
-            # Interface usage check
-            for interface in interfaces:
-                port_name = interface.get("portName", "N/A")
-                usage_stats = get_interface_usage_stats(device_id, port_name, token)
-                if usage_stats:
-                    display_interface_usage(usage_stats, port_name)
-                else:
-                    print(f"Could not retrieve usage data for port {port_name}")
+            if error is not None:
+                raise error
+            interfaces, errors_data, usage = result
+            report_device(device_id, device_name, interfaces, errors_data, usage, store, renderer)
         
         except requests.exceptions.HTTPError as http_err:
             print(f"HTTP error occurred: {http_err}")
         except Exception as err:
             print(f"An error occurred: {err}")
+
+    if renderer is not None:
+        with METRICS.phase("render"):
+            paths = renderer.close()
+        print(f"\nWrote {len(paths)} plot(s) to {args.plots_dir}")
+    if not device_count:
+        print("No devices found.")
 if __name__ == "__main__":
     main()
-
-    
\ No newline at end of file
@@ -0,0 +1,70 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+# Entry points measured and the import-time budget each must stay under
+ENTRY_POINTS = ["alldevices", "top10CRC", "testvisual", "testnew", "Catalyst_Center_Monitoring"]
+STARTUP_BUDGET = 0.5
+# Modules that must only load on the code path that needs them
+LAZY_MODULES = ["matplotlib", "tabulate", "numpy"]
+RUNS = 5
+
+PROBE = (
+    "import sys, time\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "elapsed = time.perf_counter() - start\n"
+    "loaded = [name for name in {lazy!r} if name in sys.modules]\n"
+    "print(elapsed, ','.join(loaded))\n"
+)
+
+
+def measure(module, runs=RUNS):
+    """
+    Imports an entry point in fresh interpreters and returns the best
+    (process wall time, import time, eagerly loaded heavy modules).
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    best_wall, best_import, loaded = None, None, []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, lazy=LAZY_MODULES)],
+            cwd=here, capture_output=True, text=True, check=True
+        ).stdout.split()
+        wall = time.perf_counter() - start
+        import_time = float(output[0])
+        loaded = output[1].split(",") if len(output) > 1 else []
+        best_wall = wall if best_wall is None else min(best_wall, wall)
+        best_import = import_time if best_import is None else min(best_import, import_time)
+    return best_wall, best_import, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Guard CLI startup time against regressions.")
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET,
+                        help=f"maximum import time per entry point in seconds (default {STARTUP_BUDGET})")
+    parser.add_argument("--runs", type=int, default=RUNS,
+                        help=f"fresh interpreters per entry point, best run counts (default {RUNS})")
+    args = parser.parse_args()
+
+    failures = 0
+    print(f"{'Entry point':<28} {'Process':>9} {'Import':>9}  Status")
+    for module in ENTRY_POINTS:
+        wall, import_time, loaded = measure(module, args.runs)
+        problems = []
+        if import_time > args.budget:
+            problems.append(f"over budget {args.budget:.2f}s")
+        if loaded:
+            problems.append("eagerly imports " + ", ".join(loaded))
+        failures += bool(problems)
+        status = "; ".join(problems) or "ok"
+        print(f"{module:<28} {wall:>8.3f}s {import_time:>8.3f}s  {status}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
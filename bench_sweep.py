@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from simulator import Fleet, SimulatorServer, LATENCY, PORTS_PER_DEVICE
+
+# Fleet sizes swept by default
+SIZES = [100, 1000, 10000]
+BENCH_WORKERS = 16
+
+
+def run_sweep(url, workers, rate):
+    """
+    Runs one full sweep (inventory, interfaces and error counters of every
+    device, then the fleet CRC ranking) and returns its measurements.
+    Meant to run in a fresh process so peak memory belongs to this sweep.
+    """
+    from alldevices import get_all_devices, sweep_devices, MAX_WORKERS
+    from catalyst_client import CatalystClient
+    from crc_ranking import fleet_top_crc
+
+    client = CatalystClient(url, "devnetuser", "Cisco123!", rate=rate)
+    start = time.perf_counter()
+    client.get_token()
+    counts = {"devices": 0, "interfaces": 0, "failures": 0}
+
+    def records():
+        for device_id, device_name, result, error in sweep_devices(
+                get_all_devices(client), client, workers or MAX_WORKERS):
+            counts["devices"] += 1
+            if error is not None:
+                counts["failures"] += 1
+                continue
+            interfaces, errors_data = result
+            counts["interfaces"] += len(interfaces)
+            device = {"id": device_id, "hostname": device_name}
+            for interface in errors_data:
+                yield device, interface
+
+    fleet_top_crc(records())
+    wall = time.perf_counter() - start
+    client.close()
+    return {
+        **counts,
+        "wall": wall,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def bench(size, args):
+    """
+    Serves a synthetic fleet of size devices and sweeps it from a child process.
+    """
+    server = SimulatorServer(
+        Fleet(size, args.ports), port=0, latency=args.latency,
+        rate_limit=args.rate_limit, error_rate=args.error_rate
+    ).start()
+    try:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", server.url,
+             "--workers", str(args.workers), "--client-rate", str(args.client_rate)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        result.update(server.stats())
+        return result
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="End-to-end sweep benchmark against the local simulator.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES,
+                        help=f"fleet sizes to sweep (default {' '.join(map(str, SIZES))})")
+    parser.add_argument("--ports", type=int, default=PORTS_PER_DEVICE, help="interfaces per device")
+    parser.add_argument("--workers", type=int, default=BENCH_WORKERS, help="sweep worker threads")
+    parser.add_argument("--latency", type=float, default=LATENCY, help="simulated controller latency in seconds")
+    parser.add_argument("--rate-limit", type=float, default=0, help="simulated controller rate limit (req/s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failing with a 5xx")
+    parser.add_argument("--client-rate", type=float, default=0,
+                        help="client-side rate limit in req/s (default: off, measures raw throughput)")
+    parser.add_argument("--child", metavar="URL", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.child:
+        print(json.dumps(run_sweep(args.child, args.workers, args.client_rate)))
+        return
+
+    print(f"{'Devices':>8} {'Interfaces':>11} {'Wall':>9} {'Requests':>9} {'Req/s':>8} {'MiB in':>8} {'Peak RSS':>10}  Failures")
+    for size in args.sizes:
+        result = bench(size, args)
+        rate = result["requests"] / result["wall"] if result["wall"] else 0
+        print(
+            f"{result['devices']:>8} {result['interfaces']:>11} {result['wall']:>8.2f}s "
+            f"{result['requests']:>9} {rate:>8.0f} {result['bytes'] / 2 ** 20:>8.1f} "
+            f"{result['peak_rss_kib'] / 1024:>7.1f}MiB  {result['failures']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+import urllib3
+
+from json_stream import iter_response_array
+from metrics import METRICS, endpoint_name
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# Catalyst Center tokens are valid for 60 minutes; refresh a few minutes early
+TOKEN_LIFETIME = 60 * 60
+TOKEN_REFRESH_MARGIN = 5 * 60
+# Keep-alive connections held open to the controller, sized for parallel sweeps
+POOL_SIZE = 32
+REQUEST_TIMEOUT = 30
+
+# Optional client-wide request rate cap in requests per second (0 = off:
+# the AIMD concurrency limit alone paces requests) and its burst size
+RATE_LIMIT = float(os.environ.get("CATALYST_RATE_LIMIT") or 0)
+RATE_BURST = 20
+# Adaptive concurrency: starts here and moves between the bounds
+INITIAL_CONCURRENCY = 8
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = POOL_SIZE
+# Retries for throttled (429), unavailable (5xx) or dropped GET requests
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# A shared GET result is handed to further callers for this many seconds
+# after it arrived (0 = only share requests still in flight)
+COALESCE_TTL = 5.0
+
+AUTH_PATH = "/dna/system/api/v1/auth/token"
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket; acquire() blocks until a request may be sent.
+    """
+
+    def __init__(self, rate=RATE_LIMIT, burst=RATE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AIMDLimiter:
+    """
+    Concurrency limit that grows by one slot per window of successful
+    requests (additive increase) and halves when the controller pushes back
+    (multiplicative decrease).
+    """
+
+    def __init__(self, initial=INITIAL_CONCURRENCY, minimum=MIN_CONCURRENCY,
+                 maximum=MAX_CONCURRENCY, decrease=0.5, cooldown=1.0):
+        self.limit = float(min(initial, maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        # Push back on many in-flight requests at once counts as one event
+        self.cooldown = cooldown
+        self._last_decrease = 0.0
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    def on_success(self):
+        with self._cond:
+            grown = min(self.maximum, self.limit + 1.0 / self.limit)
+            if int(grown) > int(self.limit):
+                self._cond.notify()
+            self.limit = grown
+
+    def on_backoff(self):
+        with self._cond:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown:
+                self.limit = max(self.minimum, self.limit * self.decrease)
+                self._last_decrease = now
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error", "finished")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.finished = None
+
+
+class SingleFlight:
+    """
+    Runs one call per key at a time: callers asking for a key that is in
+    flight wait for that call and share its result (or exception) instead
+    of starting their own. A successful result stays shared for ttl
+    seconds after it completed; failures are never kept.
+    """
+
+    def __init__(self, ttl=COALESCE_TTL):
+        self.ttl = ttl
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._next_prune = 0.0
+
+    def _prune(self, now):
+        for key in [key for key, flight in self._flights.items()
+                    if flight.finished is not None and now - flight.finished >= self.ttl]:
+            del self._flights[key]
+        self._next_prune = now + max(self.ttl, 1.0)
+
+    def do(self, key, call):
+        """
+        Returns (call() or the shared result, whether it was shared).
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now >= self._next_prune:
+                self._prune(now)
+            flight = self._flights.get(key)
+            shared = flight is not None and (flight.finished is None or now - flight.finished < self.ttl)
+            if not shared:
+                flight = self._flights[key] = _Flight()
+
+        if shared:
+            flight.done.wait()
+        else:
+            try:
+                flight.result = call()
+            except BaseException as err:
+                flight.error = err
+            with self._lock:
+                flight.finished = time.monotonic()
+                if flight.error is not None and self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.done.set()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result, shared
+
+
+def retry_delay(response, attempt):
+    """
+    Seconds to wait before the next attempt: the server's Retry-After if it
+    sent one, otherwise exponential backoff with full jitter.
+    """
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return min(BACKOFF_MAX, max(0.0, float(retry_after)))
+        except ValueError:
+            try:
+                return min(BACKOFF_MAX, max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time()))
+            except (TypeError, ValueError):
+                pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+class CatalystClient:
+    """
+    Shared HTTP client for Cisco DNA Center.
+
+    Holds one pooled keep-alive session and caches the X-Auth-Token with its
+    expiry. The token is refreshed before it expires, and a request answered
+    with 401 is retried once with a fresh token.
+
+    All requests pass an AIMD concurrency limit (and an optional token
+    bucket rate cap). A streamed response keeps its slot until its body has
+    been read or it is closed, so the limit counts transfers, not headers. GETs answered with 429/5xx or dropped connections are retried
+    with backoff (honoring Retry-After), and each push back shrinks the
+    concurrency limit.
+
+    get_records() coalesces identical GETs: threads asking for the same
+    path and parameters at the same time (sweeps, pollers, the exporter)
+    share one request and its parsed records. iter_records() streams a
+    listing to a single reader instead.
+    """
+
+    def __init__(self, base_url, username, password, pool_size=POOL_SIZE,
+                 timeout=REQUEST_TIMEOUT, verify=False, rate=RATE_LIMIT, burst=RATE_BURST,
+                 max_retries=MAX_RETRIES, coalesce_ttl=COALESCE_TTL):
+        self.base_url = base_url.rstrip("/")
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.verify = verify
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Accept": "application/json"
+        })
+
+        self._token = None
+        self._token_expiry = 0.0
+        self._token_lock = threading.Lock()
+
+        self.max_retries = max_retries
+        self.bucket = TokenBucket(rate, burst)
+        self.limiter = AIMDLimiter(maximum=pool_size)
+        self.flights = SingleFlight(coalesce_ttl)
+
+    def _observe(self, method, url, start, response, stream=False):
+        """
+        Feeds one exchange into the metrics. Streamed bodies are not read
+        yet, so their size is taken from Content-Length.
+        """
+        nbytes, status = 0, None
+        if response is not None:
+            status = response.status_code
+            length = response.headers.get("Content-Length")
+            if length is not None:
+                nbytes = int(length)
+            elif not stream:
+                nbytes = len(response.content)
+        METRICS.record_request(endpoint_name(method, url), time.perf_counter() - start, nbytes, status)
+
+    def _fetch_token(self):
+        url = f"{self.base_url}{AUTH_PATH}"
+        start = time.perf_counter()
+        response = self.session.post(
+            url,
+            auth=HTTPBasicAuth(self.username, self.password),
+            timeout=self.timeout
+        )
+        if METRICS.enabled:
+            self._observe("POST", url, start, response)
+        response.raise_for_status()
+        self._token = response.json()["Token"]
+        self._token_expiry = time.monotonic() + TOKEN_LIFETIME - TOKEN_REFRESH_MARGIN
+        return self._token
+
+    def get_token(self):
+        """
+        Returns the cached token, fetching a new one if missing or about to expire.
+        """
+        with self._token_lock:
+            if self._token is None or time.monotonic() >= self._token_expiry:
+                return self._fetch_token()
+            return self._token
+
+    def refresh_token(self, stale_token=None):
+        """
+        Forces a new token. If another thread already replaced stale_token,
+        its fresh token is reused instead of authenticating again.
+        """
+        with self._token_lock:
+            if stale_token is not None and self._token not in (None, stale_token):
+                return self._token
+            return self._fetch_token()
+
+    def _send(self, method, url, headers, **kwargs):
+        with METRICS.phase("throttle"):
+            self.bucket.acquire()
+            self.limiter.acquire()
+        start = time.perf_counter()
+        stream = kwargs.get("stream", False)
+        response = None
+        try:
+            response = self.session.request(method, url, headers=headers, **kwargs)
+        finally:
+            if response is None or not stream:
+                self.limiter.release()
+            if METRICS.enabled:
+                self._observe(method, url, start, response, stream)
+        if stream:
+            self._hold_slot(response)
+        return response
+
+    def _hold_slot(self, response):
+        """
+        Releases a streamed response's concurrency slot when it is closed
+        rather than when its headers arrived. Every streamed response is
+        closed once read (iter_response_array) or dropped.
+        """
+        close = response.close
+        released = threading.Lock()
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                if released.acquire(blocking=False):
+                    self.limiter.release()
+
+        response.close = close_and_release
+
+    def _send_authenticated(self, method, url, headers, **kwargs):
+        token = self.get_token()
+        headers["X-Auth-Token"] = token
+        response = self._send(method, url, headers, **kwargs)
+        if response.status_code == 401:
+            # Token expired or was revoked server side; retry once with a new one
+            response.close()
+            headers["X-Auth-Token"] = self.refresh_token(token)
+            response = self._send(method, url, headers, **kwargs)
+        return response
+
+    def request(self, method, path, **kwargs):
+        """
+        Sends an authenticated request to a path below the base URL.
+        """
+        url = path if path.startswith("http") else f"{self.base_url}{path}"
+        kwargs.setdefault("timeout", self.timeout)
+        headers = dict(kwargs.pop("headers", None) or {})
+        retries = self.max_retries if method == "GET" else 0
+
+        for attempt in range(retries + 1):
+            try:
+                response = self._send_authenticated(method, url, headers, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == retries:
+                    raise
+                if METRICS.enabled:
+                    METRICS.record_retry(endpoint_name(method, url))
+                self.limiter.on_backoff()
+                time.sleep(retry_delay(None, attempt))
+                continue
+
+            if response.status_code not in RETRY_STATUSES:
+                # Other server errors are returned as they are but never grow the limit
+                if response.status_code < 500:
+                    self.limiter.on_success()
+                return response
+            self.limiter.on_backoff()
+            if attempt == retries:
+                return response
+            if METRICS.enabled:
+                METRICS.record_retry(endpoint_name(method, url))
+            delay = retry_delay(response, attempt)
+            response.close()
+            time.sleep(delay)
+        return response
+
+    def get(self, path, params=None, **kwargs):
+        return self.request("GET", path, params=params, **kwargs)
+
+    def iter_records(self, path, params=None, record=None, missing=()):
+        """
+        GETs a path and returns an iterator over the records of its
+        "response" array, parsed off the socket as the body arrives (as
+        record instances if a Record class is given). Returns None if the
+        status is one of missing, raises HTTPError on other failures.
+
+        Nothing is coalesced or kept: for large listings that the caller
+        reads once. The response is closed once the iterator is exhausted
+        or closed.
+        """
+        response = self.get(path, params=params, stream=True)
+        if response.status_code in missing:
+            response.close()
+            return None
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError:
+            response.close()
+            raise
+        return iter_response_array(response, record=record)
+
+    def _fetch_records(self, path, params, record, missing):
+        records = self.iter_records(path, params, record, missing)
+        return None if records is None else list(records)
+
+    def get_records(self, path, params=None, record=None, missing=()):
+        """
+        GETs a path and returns the records of its "response" array (as
+        record instances if a Record class is given). Returns None if the
+        status is one of missing, raises HTTPError on other failures.
+
+        Concurrent calls with the same arguments share one request, and a
+        result is reused for COALESCE_TTL seconds after it arrived. Every
+        caller gets its own list, but the records in it are shared.
+        """
+        key = (path, tuple(sorted((params or {}).items())), record, tuple(missing))
+        records, shared = self.flights.do(key, lambda: self._fetch_records(path, params, record, missing))
+        if shared and METRICS.enabled:
+            METRICS.record_coalesced(endpoint_name("GET", f"{self.base_url}{path}"))
+        return None if records is None else list(records)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,174 @@
+import heapq
+import itertools
+import os
+import sqlite3
+import threading
+import time
+
+COUNTER_PATH = os.environ.get(
+    "CATALYST_COUNTERS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "counters.sqlite3")
+)
+# Rankings look at this much recent history
+RATE_WINDOW = 24 * 60 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    device_id TEXT NOT NULL,
+    port_name TEXT NOT NULL,
+    UNIQUE (device_id, port_name)
+);
+CREATE TABLE IF NOT EXISTS samples (
+    series_id INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    crc INTEGER NOT NULL,
+    PRIMARY KEY (series_id, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS samples_ts ON samples (ts);
+"""
+
+# Sum of per-poll increments per interface inside the window. A counter that
+# went down was cleared by a reload, so its new value is the increment. The
+# series are picked first, so one device costs only its own samples, and the
+# last sample before the window is the baseline of its first increment, so
+# ports polled less often than the window still get a rate.
+RATE_QUERY = """
+WITH sel AS (
+    SELECT id FROM series {where}
+), points AS (
+    SELECT series_id, ts, crc FROM samples
+    WHERE series_id IN sel AND ts >= :since
+    UNION ALL
+    SELECT sel.id, b.ts, b.crc FROM sel JOIN samples b ON b.series_id = sel.id
+    WHERE b.ts = (SELECT ts FROM samples WHERE series_id = sel.id AND ts < :since ORDER BY ts DESC LIMIT 1)
+), d AS (
+    SELECT series_id, ts, crc,
+           LAG(crc) OVER w AS prev_crc,
+           LAG(ts) OVER w AS prev_ts
+    FROM points
+    WINDOW w AS (PARTITION BY series_id ORDER BY ts)
+)
+SELECT s.device_id, s.port_name,
+       SUM(CASE WHEN d.crc >= d.prev_crc THEN d.crc - d.prev_crc ELSE d.crc END) AS delta,
+       MAX(d.ts) - MIN(d.prev_ts) AS span
+FROM d JOIN series s ON s.id = d.series_id
+WHERE d.prev_crc IS NOT NULL
+GROUP BY d.series_id
+"""
+
+
+def counter_delta(previous, current):
+    """
+    Increment between two readings of a monotonic counter, treating a drop
+    as a counter reset.
+    """
+    return current - previous if current >= previous else current
+
+
+class CounterStore:
+    """
+    Append-only SQLite time series of per-interface CRC error counters.
+
+    Each poll appends one (series, timestamp, value) row per interface;
+    delta and rate queries handle counter resets after a device reload.
+    """
+
+    def __init__(self, path=COUNTER_PATH):
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _series_id(self, device_id, port_name):
+        key = (device_id, port_name)
+        series_id = self._series.get(key)
+        if series_id is None:
+            self.db.execute(
+                "INSERT OR IGNORE INTO series (device_id, port_name) VALUES (?, ?)", key
+            )
+            series_id = self.db.execute(
+                "SELECT id FROM series WHERE device_id = ? AND port_name = ?", key
+            ).fetchone()[0]
+            self._series[key] = series_id
+        return series_id
+
+    def record_poll(self, device_id, errors_data, ts=None):
+        """
+        Appends one poll of get_interface_errors() output for a device.
+        errors_data may be a stream; it is read before the store is locked.
+        """
+        ts = int(time.time() if ts is None else ts)
+        readings = [
+            (interface["portName"], int(interface.get("crcErrors") or 0))
+            for interface in errors_data or []
+            if interface.get("portName")
+        ]
+        with self._lock, self.db:
+            rows = [(self._series_id(device_id, port_name), ts, crc) for port_name, crc in readings]
+            self.db.executemany(
+                "INSERT OR REPLACE INTO samples (series_id, ts, crc) VALUES (?, ?, ?)", rows
+            )
+
+    def history(self, device_id, port_name, since=0):
+        """
+        Returns the [(ts, crc), ...] samples of one interface.
+        """
+        with self._lock:
+            return self.db.execute(
+                "SELECT ts, crc FROM samples JOIN series ON series.id = samples.series_id "
+                "WHERE device_id = ? AND port_name = ? AND ts >= ? ORDER BY ts",
+                (device_id, port_name, since)
+            ).fetchall()
+
+    def deltas(self, device_id, port_name, since=0):
+        """
+        Returns the [(ts, increment), ...] between consecutive samples of one interface.
+        """
+        samples = self.history(device_id, port_name, since)
+        return [
+            (ts, counter_delta(previous, current))
+            for (_, previous), (ts, current) in zip(samples, samples[1:])
+        ]
+
+    def iter_rates(self, window=RATE_WINDOW, device_id=None, now=None):
+        """
+        Yields (device_id, port_name, delta, rate_per_hour) over the last
+        window seconds for every interface with a sample inside the window
+        and an earlier one to compare it with. Rows are streamed from their own connection, so
+        the caller never holds the whole fleet.
+        """
+        since = int((time.time() if now is None else now) - window)
+        where, params = "", {"since": since}
+        if device_id is not None:
+            where, params = "WHERE device_id = :device_id", {"since": since, "device_id": device_id}
+        db = sqlite3.connect(self.path)
+        try:
+            for dev_id, port_name, delta, span in db.execute(RATE_QUERY.format(where=where), params):
+                yield dev_id, port_name, delta, delta * 3600.0 / span if span else 0.0
+        finally:
+            db.close()
+
+    def rates(self, window=RATE_WINDOW, device_id=None, now=None):
+        """
+        Returns the iter_rates() rows as a list.
+        """
+        return list(self.iter_rates(window, device_id, now))
+
+    def top_rates(self, top_n=10, window=RATE_WINDOW, device_id=None):
+        """
+        Returns the top_n interfaces with a non-zero recent CRC error rate,
+        fastest first, or None if no interface has two samples in the window yet.
+        """
+        rates = self.iter_rates(window, device_id)
+        first = next(rates, None)
+        if first is None:
+            return None
+        return heapq.nlargest(
+            top_n, (row for row in itertools.chain([first], rates) if row[3] > 0), key=lambda row: row[3]
+        )
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,227 @@
+import os
+import sqlite3
+import time
+import warnings
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from counter_store import COUNTER_PATH
+
+# History scored per interface, bucket width, and the trailing buckets
+# compared against the baseline formed by all earlier ones
+HISTORY_DAYS = 30
+BUCKET_SECONDS = 60 * 60
+RECENT_BUCKETS = 6
+# Scores at or above this are anomalies (3.5 is the usual cut-off for
+# robust z-scores); the recent rate must also reach MIN_RATE errors/bucket
+Z_THRESHOLD = 3.5
+MIN_RATE = 1.0
+# Lower bound for the baseline spread, so a port that never erred is not
+# flagged for a single error
+MIN_SCALE = 1.0
+EWMA_ALPHA = 0.05
+# Series (interfaces) per process pool task
+SHARD_SIZE = 10000
+
+# CRC increments between consecutive samples of a series ID range, with the
+# first and last sample time of each series; counter drops are resets. Only
+# series whose first and last sample in the window differ are read (two
+# index lookups each), and zero increments are not returned, so quiet ports
+# cost next to nothing. A port reset back to exactly its starting count
+# within the window is treated as quiet.
+INCREMENT_QUERY = """
+WITH active AS (
+    SELECT id FROM series
+    WHERE id BETWEEN :first AND :last
+      AND (SELECT crc FROM samples WHERE series_id = series.id AND ts >= :start AND ts < :end ORDER BY ts LIMIT 1)
+          IS NOT (SELECT crc FROM samples WHERE series_id = series.id AND ts < :end ORDER BY ts DESC LIMIT 1)
+), d AS (
+    SELECT series_id, ts, LAG(ts) OVER w AS prev_ts,
+           CASE WHEN crc >= LAG(crc) OVER w THEN crc - LAG(crc) OVER w ELSE crc END AS delta,
+           MIN(ts) OVER s AS first_ts, MAX(ts) OVER s AS last_ts
+    FROM samples
+    WHERE series_id IN active AND ts >= :start AND ts < :end
+    WINDOW w AS (PARTITION BY series_id ORDER BY ts), s AS (PARTITION BY series_id)
+)
+SELECT series_id, prev_ts, ts, delta, first_ts, last_ts
+FROM d
+WHERE prev_ts IS NOT NULL AND delta > 0
+"""
+
+Anomaly = namedtuple("Anomaly", "device_id port_name score rate baseline")
+
+
+def robust_scores(matrix, recent=RECENT_BUCKETS, min_scale=MIN_SCALE):
+    """
+    Robust z-score of each row's recent mean against the median and MAD
+    of its earlier buckets. NaN buckets (never sampled) are left out.
+    Returns (scores, recent rates, baselines).
+    """
+    baseline = matrix[:, :-recent]
+    with warnings.catch_warnings():
+        # Rows without any sampled baseline or recent bucket score NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        current = np.nanmean(matrix[:, -recent:], axis=1)
+        median = np.nanmedian(baseline, axis=1)
+        mad = np.nanmedian(np.abs(baseline - median[:, None]), axis=1) * 1.4826
+    return (current - median) / np.maximum(mad, min_scale), current, median
+
+
+def ewma_scores(matrix, recent=RECENT_BUCKETS, alpha=EWMA_ALPHA, min_scale=MIN_SCALE):
+    """
+    Deviation of each row's recent mean from an exponentially weighted mean
+    of its earlier buckets, in units of the weighted standard deviation.
+    The recursion runs once per bucket over all rows at once; a row starts
+    at its first sampled bucket and skips NaN (never sampled) ones.
+    """
+    baseline = matrix[:, :-recent]
+    mean = np.full(len(matrix), np.nan)
+    var = np.zeros_like(mean)
+    for column in baseline.T:
+        sampled = ~np.isnan(column)
+        first = sampled & np.isnan(mean)
+        mean[first] = column[first]
+        update = sampled & ~first
+        diff = column[update] - mean[update]
+        increment = alpha * diff
+        mean[update] += increment
+        var[update] = (1 - alpha) * (var[update] + diff * increment)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        current = np.nanmean(matrix[:, -recent:], axis=1)
+    return (current - mean) / np.maximum(np.sqrt(var), min_scale), current, mean
+
+
+SCORERS = {"robust": robust_scores, "ewma": ewma_scores}
+
+
+def increment_matrix(rows, prev_ts, ts, values, first_ts, last_ts, n_rows, start, n_buckets, bucket=BUCKET_SECONDS):
+    """
+    Dense (rows x buckets) float32 matrix of CRC errors per bucket.
+
+    Each increment is spread evenly over the time since the previous sample,
+    so a port polled less often than once per bucket keeps its real rate
+    instead of landing in one bucket as a spike. Buckets outside a row's
+    first..last sample are NaN: never sampled, rather than error free.
+    first_ts and last_ts hold one entry per row.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    low = np.asarray(prev_ts, dtype=np.float64) - start
+    high = np.asarray(ts, dtype=np.float64) - start
+    values = np.asarray(values, dtype=np.float64)
+    first, last = (low // bucket).astype(np.int64), (high // bucket).astype(np.int64)
+    rate = values / (high - low)
+    size = n_rows * n_buckets
+    # Partial buckets at both ends of each interval (the whole increment
+    # when both ends fall in the same bucket)
+    single = first == last
+    head = np.where(single, values, rate * ((first + 1) * bucket - low))
+    tail = np.where(single, 0.0, rate * (high - last * bucket))
+    matrix = np.bincount(rows * n_buckets + first, weights=head, minlength=size)
+    matrix += np.bincount(rows * n_buckets + last, weights=tail, minlength=size)
+    # Full buckets in between: rate * bucket from first + 1 up to last - 1,
+    # as a step added at first + 1 and removed at last, summed along each row
+    inner = last - first > 1
+    steps = np.bincount(rows[inner] * n_buckets + first[inner] + 1, weights=rate[inner] * bucket, minlength=size)
+    steps -= np.bincount(rows[inner] * n_buckets + last[inner], weights=rate[inner] * bucket, minlength=size)
+    matrix = (matrix + np.cumsum(steps.reshape(n_rows, n_buckets), axis=1).ravel()).reshape(n_rows, n_buckets)
+
+    columns = np.arange(n_buckets)
+    sampled_from = ((np.asarray(first_ts, dtype=np.int64) - start) // bucket)[:, None]
+    sampled_to = ((np.asarray(last_ts, dtype=np.int64) - start) // bucket)[:, None]
+    matrix[(columns < sampled_from) | (columns > sampled_to)] = np.nan
+    return matrix.astype(np.float32)
+
+
+def flag(matrix, method="robust", recent=RECENT_BUCKETS, threshold=Z_THRESHOLD, min_rate=MIN_RATE):
+    """
+    Scores a matrix and returns [(row, score, rate, baseline), ...] of the
+    rows that are anomalous.
+    """
+    scores, current, baseline = SCORERS[method](matrix, recent)
+    rows = np.flatnonzero((scores >= threshold) & (current >= min_rate))
+    return [(int(row), float(scores[row]), float(current[row]), float(baseline[row])) for row in rows]
+
+
+def score_shard(path, first, last, start, n_buckets, bucket=BUCKET_SECONDS,
+                method="robust", recent=RECENT_BUCKETS, threshold=Z_THRESHOLD):
+    """
+    Loads and scores the series IDs first..last. Runs in a worker process
+    with its own read-only connection; returns [(series_id, score, rate, baseline), ...].
+    """
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = db.execute(
+            INCREMENT_QUERY, {"first": first, "last": last, "start": start, "end": start + n_buckets * bucket}
+        ).fetchall()
+    finally:
+        db.close()
+    if not rows:
+        return []
+    series, prev_ts, ts, values, first_ts, last_ts = zip(*rows)
+    # One matrix row per series that had any errors; the rest score zero
+    ids, index, rows = np.unique(np.asarray(series, dtype=np.int64), return_index=True, return_inverse=True)
+    matrix = increment_matrix(
+        rows, prev_ts, ts, values, np.asarray(first_ts)[index], np.asarray(last_ts)[index],
+        len(ids), start, n_buckets, bucket
+    )
+    return [(int(ids[row]), score, rate, base) for row, score, rate, base in flag(matrix, method, recent, threshold)]
+
+
+def detect_anomalies(path=COUNTER_PATH, days=HISTORY_DAYS, bucket=BUCKET_SECONDS, method="robust",
+                     recent=RECENT_BUCKETS, threshold=Z_THRESHOLD, workers=None, shard_size=SHARD_SIZE, now=None):
+    """
+    Scores every interface in the counter store against its own history.
+
+    Series are split into ID ranges of shard_size and scored on a process
+    pool, each worker reading its range straight from SQLite and scoring
+    it with NumPy. Returns Anomaly records, highest score first, or None if
+    the store does not hold any counter history yet.
+    """
+    end = int(time.time() if now is None else now)
+    n_buckets = int(days * 24 * 3600 // bucket)
+    start = end - n_buckets * bucket
+    if not os.path.exists(path):
+        return None
+    # Read-only, so a run before the first poll leaves no empty store behind
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        if db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'series'").fetchone() is None:
+            return None
+        low, high = db.execute("SELECT MIN(id), MAX(id) FROM series").fetchone()
+        if low is None:
+            return None
+        ranges = [(first, min(first + shard_size - 1, high)) for first in range(low, high + 1, shard_size)]
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            futures = [
+                executor.submit(score_shard, path, first, last, start, n_buckets, bucket, method, recent, threshold)
+                for first, last in ranges
+            ]
+            flagged = [hit for future in futures for hit in future.result()]
+
+        names = {}
+        ids = [hit[0] for hit in flagged]
+        for offset in range(0, len(ids), 500):
+            chunk = ids[offset:offset + 500]
+            names.update(
+                (series_id, (device_id, port_name)) for series_id, device_id, port_name in db.execute(
+                    f"SELECT id, device_id, port_name FROM series WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                )
+            )
+    finally:
+        db.close()
+    anomalies = [Anomaly(*names[series_id], score, rate, base) for series_id, score, rate, base in flagged]
+    anomalies.sort(key=lambda anomaly: anomaly.score, reverse=True)
+    return anomalies
+
+
+def print_anomalies(anomalies, hostnames=None, bucket=BUCKET_SECONDS, limit=None):
+    hostnames = hostnames or {}
+    per = "hour" if bucket == 3600 else f"{bucket}s"
+    print(f"\n{len(anomalies)} interface(s) with CRC error rates far above their own baseline:")
+    for anomaly in anomalies[:limit]:
+        name = hostnames.get(anomaly.device_id) or anomaly.device_id
+        print(f"{name} {anomaly.port_name}: {anomaly.rate:.1f} CRC errors/{per} "
+              f"(baseline {anomaly.baseline:.1f}, score {anomaly.score:.1f})")
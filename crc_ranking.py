@@ -0,0 +1,112 @@
+import heapq
+from itertools import count
+
+
+def device_site(device):
+    return device.get("locationName") or device.get("location") or device.get("siteId") or "unknown"
+
+
+def device_family(device):
+    return device.get("family") or "unknown"
+
+
+def device_cluster(device):
+    return device.get("cluster") or "default"
+
+
+# Groupings computed alongside the global ranking
+GROUPINGS = {
+    "site": device_site,
+    "family": device_family,
+}
+# A federated fleet is also ranked per controller cluster
+FEDERATED_GROUPINGS = dict(GROUPINGS, cluster=device_cluster)
+
+
+class TopN:
+    """
+    Bounded min-heap that keeps the n largest values pushed into it.
+    Memory stays O(n) however many values are pushed.
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self._heap = []
+        # Tie breaker so items themselves never need to be comparable
+        self._seq = count()
+
+    def push(self, value, item):
+        if self.n <= 0:
+            return
+        if len(self._heap) < self.n:
+            heapq.heappush(self._heap, (value, next(self._seq), item))
+        elif value > self._heap[0][0]:
+            heapq.heapreplace(self._heap, (value, next(self._seq), item))
+
+    def ranked(self):
+        """
+        Returns [(value, item), ...], largest first.
+        """
+        return [(value, item) for value, _, item in sorted(self._heap, key=lambda e: (-e[0], e[1]))]
+
+
+def fleet_top_crc(records, top_n=10, groupings=GROUPINGS, value=None):
+    """
+    Ranks interfaces across the whole fleet in a single pass.
+
+    records yields (device, interface) pairs where device is a network-device
+    record and interface an entry of get_interface_errors(). Only interfaces
+    with a positive value are ranked; value(interface) defaults to the
+    absolute crcErrors counter. Returns
+    {"global": [(crc, hostname, portName), ...], "<grouping>": {group: [...]}}.
+    """
+    value = value or (lambda interface: interface.get("crcErrors") or 0)
+    overall = TopN(top_n)
+    grouped = {name: {} for name in groupings}
+
+    for device, interface in records:
+        crc = value(interface)
+        if crc <= 0:
+            continue
+        label = device.get("hostname", device.get("id"))
+        if device.get("cluster"):
+            # Hostnames are only unique within one controller
+            label = f"{device.get('cluster')}/{label}"
+        item = (label, interface.get("portName", "N/A"))
+        overall.push(crc, item)
+        for name, key in groupings.items():
+            group = key(device)
+            heap = grouped[name].get(group)
+            if heap is None:
+                heap = grouped[name][group] = TopN(top_n)
+            heap.push(crc, item)
+
+    def flatten(heap):
+        return [(crc, hostname, port_name) for crc, (hostname, port_name) in heap.ranked()]
+
+    ranking = {"global": flatten(overall)}
+    for name, groups in grouped.items():
+        ranking[name] = {group: flatten(heap) for group, heap in sorted(groups.items())}
+    return ranking
+
+
+def _format_value(value, per_hour):
+    return f"{value:.1f} CRC errors/h" if per_hour else f"{value} CRC errors"
+
+
+def print_fleet_ranking(ranking, top_n=10, per_hour=False):
+    """
+    Prints a fleet_top_crc() ranking; per_hour if it was ranked by rate.
+    """
+    title = "by CRC Error Rate" if per_hour else "with CRC Errors"
+    print(f"\nTop {top_n} Interfaces {title} (fleet-wide):")
+    for crc, hostname, port_name in ranking["global"]:
+        print(f"{hostname} {port_name}: {_format_value(crc, per_hour)}")
+
+    for name, groups in ranking.items():
+        if name == "global":
+            continue
+        for group, entries in groups.items():
+            print(f"\nTop {top_n} by {name} '{group}':")
+            for crc, hostname, port_name in entries:
+                print(f"{hostname} {port_name}: {_format_value(crc, per_hour)}")
@@ -0,0 +1,190 @@
+import gzip
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EXPORTER_HOST = "0.0.0.0"
+EXPORTER_PORT = 9850
+# The scrape payload is rebuilt at most this often, and only after new polls
+RENDER_INTERVAL = 5
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# (metric name, type, help, endpoint it comes from, value of one API record)
+FAMILIES = [
+    ("catalyst_interface_oper_up", "gauge", "Interface operational status (1 = up).", "interfaces",
+     lambda interface: 1 if interface.get("status") == "up" else 0),
+    ("catalyst_interface_admin_up", "gauge", "Interface administrative status (1 = up).", "interfaces",
+     lambda interface: 1 if interface.get("adminStatus") == "UP" else 0),
+    ("catalyst_interface_speed_kbps", "gauge", "Interface speed as reported by the controller, in kbps.", "interfaces",
+     lambda interface: interface.get("speed")),
+    ("catalyst_interface_crc_errors_total", "counter", "Interface CRC error counter.", "errors",
+     lambda interface: interface.get("crcErrors")),
+    ("catalyst_interface_input_errors_total", "counter", "Interface input error counter.", "errors",
+     lambda interface: interface.get("inputErrors")),
+    ("catalyst_interface_output_errors_total", "counter", "Interface output error counter.", "errors",
+     lambda interface: interface.get("outputErrors")),
+]
+POLL_FAMILY = ("catalyst_device_last_poll_timestamp_seconds", "gauge",
+               "Unix time of the last successful poll per device and endpoint.")
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return str(int(number)) if number.is_integer() else repr(number)
+
+
+def _chunk(text):
+    """
+    Caches a piece of the payload as plain bytes and as its own gzip member.
+    Concatenated gzip members are a valid gzip stream, so the compressed
+    payload is built by joining members without compressing anything again.
+    """
+    body = text.encode()
+    return body, gzip.compress(body, compresslevel=6) if body else b""
+
+
+class InterfaceExporter:
+    """
+    Prometheus view of the latest poll results.
+
+    Each poll result is rendered into text lines for its device right away
+    and cached plain and compressed, so only devices that changed are ever
+    rendered or compressed again. The full payload is joined from the cached
+    pieces in the background at most every RENDER_INTERVAL seconds. A
+    scrape only hands out the latest prebuilt bytes, so its cost does not
+    depend on fleet size or on how many scrapers there are.
+    """
+
+    def __init__(self, render_interval=RENDER_INTERVAL):
+        self.render_interval = render_interval
+        # family name -> device ID -> (plain, gzip) sample lines
+        self._lines = {name: {} for name, _, _, _, _ in FAMILIES}
+        self._lines[POLL_FAMILY[0]] = {}
+        # device ID -> endpoint -> last poll line
+        self._polled = {}
+        self._headers = {
+            name: _chunk(f"# HELP {name} {help_text}\n# TYPE {name} {metric_type}\n")
+            for name, metric_type, help_text, _, _ in FAMILIES + [POLL_FAMILY + (None, None)]
+        }
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self.rendered_at = None
+        self.render()
+
+    def update(self, device, endpoint, result):
+        """
+        Poller on_result callback: replaces the device's samples for endpoint.
+        """
+        device_id = device["id"]
+        base = f'device_id="{_label(device_id)}",hostname="{_label(device.get("hostname") or device_id)}"'
+        if device.get("cluster"):
+            base += f',cluster="{_label(device.get("cluster"))}"'
+        rendered = {}
+        for name, _, _, source, value in FAMILIES:
+            if source != endpoint:
+                continue
+            lines = []
+            for interface in result or ():
+                number = _number(value(interface))
+                if number is not None:
+                    lines.append(f'{name}{{{base},port="{_label(interface.get("portName", "N/A"))}"}} {number}\n')
+            rendered[name] = _chunk("".join(lines))
+        poll_line = f'{POLL_FAMILY[0]}{{{base},endpoint="{endpoint}"}} {time.time():.3f}\n'
+        with self._lock:
+            polled = self._polled.setdefault(device_id, {})
+            polled[endpoint] = poll_line
+            rendered[POLL_FAMILY[0]] = _chunk("".join(polled.values()))
+            for name, chunk in rendered.items():
+                self._lines[name][device_id] = chunk
+        self._dirty.set()
+
+    def render(self, device_ids=None):
+        """
+        Rebuilds the scrape payload from the cached per-device pieces. With
+        device_ids, samples of devices no longer in it are dropped first.
+        """
+        with self._lock:
+            if device_ids is not None:
+                keep = set(device_ids)
+                for devices in self._lines.values():
+                    for device_id in devices.keys() - keep:
+                        del devices[device_id]
+                for device_id in self._polled.keys() - keep:
+                    del self._polled[device_id]
+            families = {name: list(devices.values()) for name, devices in self._lines.items()}
+        chunks = []
+        for name in [family[0] for family in FAMILIES] + [POLL_FAMILY[0]]:
+            chunks.append(self._headers[name])
+            chunks.extend(families[name])
+        self.rendered_at = time.time()
+        chunks.append(_chunk(
+            "# HELP catalyst_exporter_render_timestamp_seconds Unix time the scrape payload was built.\n"
+            "# TYPE catalyst_exporter_render_timestamp_seconds gauge\n"
+            f"catalyst_exporter_render_timestamp_seconds {self.rendered_at:.3f}\n"
+        ))
+        self._payload = (b"".join(plain for plain, _ in chunks), b"".join(packed for _, packed in chunks))
+
+    def payload(self, compressed=False):
+        return self._payload[1] if compressed else self._payload[0]
+
+    def run_renderer(self, stop, device_ids=None):
+        """
+        Re-renders after new results, at most every render_interval seconds,
+        until stop (a threading.Event) is set. device_ids() returns the
+        current inventory, used to drop removed devices.
+        """
+        while not stop.is_set():
+            if self._dirty.wait(self.render_interval):
+                self._dirty.clear()
+                self.render(None if device_ids is None else device_ids())
+                stop.wait(self.render_interval)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        compressed = "gzip" in self.headers.get("Accept-Encoding", "")
+        body = self.server.exporter.payload(compressed)
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        if compressed:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ExporterServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, exporter, host=EXPORTER_HOST, port=EXPORTER_PORT):
+        super().__init__((host, port), _Handler)
+        self.exporter = exporter
+
+    def handle_error(self, request, client_address):
+        # Scrapers hanging up mid-response are not worth a traceback
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+def serve_exporter(exporter, host=EXPORTER_HOST, port=EXPORTER_PORT):
+    """
+    Returns a threaded HTTP server answering /metrics from exporter.
+    """
+    return ExporterServer(exporter, host, port)
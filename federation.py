@@ -0,0 +1,150 @@
+import json
+import os
+import queue
+import threading
+
+from catalyst_client import CatalystClient, POOL_SIZE, RATE_LIMIT, RATE_BURST
+from inventory_cache import CACHE_PATH
+
+# JSON list of controllers, e.g.
+# [{"name": "emea", "url": "https://dnac-emea.example.net",
+#   "username": "monitor", "password_env": "DNAC_EMEA_PASSWORD", "rate": 20}]
+CONTROLLERS_PATH = os.environ.get("CATALYST_CONTROLLERS")
+# Results buffered between the per-cluster workers and the consumer
+MERGE_QUEUE_SIZE = 1024
+# How often a worker blocked on a full queue checks whether the consumer
+# is gone, and how long an early exit waits for the workers to stop
+PUT_INTERVAL = 0.5
+JOIN_TIMEOUT = 5.0
+
+_DONE = object()
+
+
+def load_controllers(path=CONTROLLERS_PATH):
+    """
+    Reads the controller list. Each entry needs name, url and username;
+    the password is given inline ("password") or read from the environment
+    variable named by "password_env". "rate", "burst" and "pool_size"
+    optionally override the client defaults for that controller.
+    """
+    with open(path) as f:
+        controllers = json.load(f)
+    names = set()
+    for controller in controllers:
+        for field in ("name", "url", "username"):
+            if not controller.get(field):
+                raise ValueError(f"Controller entry {controller!r} is missing '{field}'")
+        if controller["name"] in names:
+            raise ValueError(f"Duplicate controller name '{controller['name']}'")
+        names.add(controller["name"])
+        if "password" not in controller:
+            variable = controller.get("password_env")
+            if not variable or variable not in os.environ:
+                raise ValueError(f"No password for controller '{controller['name']}'")
+            controller["password"] = os.environ[variable]
+    return controllers
+
+
+def cluster_cache_path(name, path=CACHE_PATH):
+    """
+    Per-cluster inventory cache file; a shared cache would drop the other
+    clusters' devices on every sync.
+    """
+    root, ext = os.path.splitext(path)
+    return f"{root}-{name}{ext}"
+
+
+class Cluster:
+    """
+    One controller of a federation with its own client, which means its
+    own connection pool, token and rate limit.
+    """
+
+    def __init__(self, name, client):
+        self.name = name
+        self.client = client
+
+    def tag(self, devices):
+        """
+        Yields device records tagged with this cluster's name.
+        """
+        for device in devices:
+            if isinstance(device, dict):
+                device["cluster"] = self.name
+            else:
+                device.cluster = self.name
+            yield device
+
+    def close(self):
+        self.client.close()
+
+
+def connect(controllers, pool_size=POOL_SIZE, rate=RATE_LIMIT):
+    """
+    Creates one Cluster per controller entry; rate is the request rate cap
+    of controllers without their own "rate".
+    """
+    return [
+        Cluster(controller["name"], CatalystClient(
+            controller["url"], controller["username"], controller["password"],
+            pool_size=controller.get("pool_size", pool_size),
+            rate=controller.get("rate", rate),
+            burst=controller.get("burst", RATE_BURST),
+        ))
+        for controller in controllers
+    ]
+
+
+def merge(clusters, work, queue_size=MERGE_QUEUE_SIZE):
+    """
+    Runs work(cluster), which returns an iterable, for every cluster on its
+    own thread and yields (cluster, item, None) as items arrive from any of
+    them. A cluster whose work raises yields (cluster, None, error) once and
+    stops; the other clusters carry on. The whole merge takes as long as
+    the slowest cluster, not the sum of all of them.
+    """
+    results = queue.Queue(queue_size)
+    stop = threading.Event()
+
+    def put(entry):
+        # Gives up once the consumer is gone instead of blocking on a full queue
+        while not stop.is_set():
+            try:
+                results.put(entry, timeout=PUT_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def run(cluster):
+        items = None
+        try:
+            items = iter(work(cluster))
+            for item in items:
+                if not put((cluster, item, None)):
+                    return
+        except Exception as err:
+            put((cluster, None, err))
+        finally:
+            if hasattr(items, "close"):
+                items.close()
+            put((cluster, _DONE, None))
+
+    threads = [threading.Thread(target=run, args=(cluster,), daemon=True) for cluster in clusters]
+    for thread in threads:
+        thread.start()
+    running = len(threads)
+    try:
+        while running:
+            cluster, item, error = results.get()
+            if item is _DONE:
+                running -= 1
+                continue
+            yield cluster, item, error
+    finally:
+        # Consumer gave up early (or raised): the workers see stop at their
+        # next item and close their work. One stuck in a request is left
+        # behind as a daemon rather than holding up the exit.
+        stop.set()
+        for thread in threads:
+            thread.join(JOIN_TIMEOUT)
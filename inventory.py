@@ -0,0 +1,198 @@
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from records import DeviceRecord, InterfaceRecord
+
+DEVICE_PATH = "/dna/intent/api/v1/network-device"
+# Largest page the network-device API accepts
+PAGE_SIZE = 500
+# How long a built hostname/IP/serial index is trusted before it is rebuilt
+INDEX_TTL = 15 * 60
+INDEX_FIELDS = ("hostname", "managementIpAddress", "serialNumber")
+# Global interface listing used for bulk sweeps, and its largest page
+INTERFACE_PATH = "/dna/intent/api/v1/interface"
+INTERFACE_COUNT_PATH = "/dna/intent/api/v1/interface/count"
+INTERFACE_PAGE_SIZE = 500
+# Interface pages fetched in parallel once the total count is known
+BULK_WORKERS = 8
+
+
+def iter_pages(fetch_page, page_size=PAGE_SIZE, prefetch=True, start=1):
+    """
+    Walks an offset/limit listing and yields its records one by one.
+
+    fetch_page(offset, limit) must return the records of one page. Offsets
+    are 1-based as in the Catalyst Center API. A short page ends the walk.
+    With prefetch the next page is requested in the background while the
+    caller consumes the current one. start is the offset of the first page.
+    """
+    offset = start
+    if not prefetch:
+        while True:
+            page = fetch_page(offset, page_size)
+            yield from page
+            if len(page) < page_size:
+                return
+            offset += page_size
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pending = executor.submit(fetch_page, offset, page_size)
+        while pending is not None:
+            page = pending.result()
+            pending = None
+            if len(page) >= page_size:
+                offset += page_size
+                pending = executor.submit(fetch_page, offset, page_size)
+            yield from page
+
+
+def fetch_device_page(client, offset, limit, params=None):
+    """
+    Fetches one page of the network-device listing.
+    """
+    query = dict(params or {})
+    query.update({"offset": offset, "limit": limit})
+    return client.get_records(DEVICE_PATH, params=query, record=DeviceRecord)
+
+
+def iter_devices(client, page_size=PAGE_SIZE, prefetch=True, params=None):
+    """
+    Yields every device in the inventory as its page arrives.
+    Extra params (e.g. hostname, family) are passed on as server-side filters.
+    """
+    return iter_pages(
+        lambda offset, limit: fetch_device_page(client, offset, limit, params),
+        page_size=page_size,
+        prefetch=prefetch
+    )
+
+
+def fetch_interface_page(client, offset, limit):
+    """
+    Fetches one page of the global interface listing.
+    """
+    return client.get_records(INTERFACE_PATH, params={"offset": offset, "limit": limit}, record=InterfaceRecord)
+
+
+def iter_interfaces(client, page_size=INTERFACE_PAGE_SIZE, workers=BULK_WORKERS):
+    """
+    Yields every interface of every device from the global listing.
+
+    The page count comes from /interface/count, so pages are fetched
+    workers at a time instead of one after the other. If the listing grew
+    during the walk, the rest is paged sequentially.
+    """
+    response = client.get(INTERFACE_COUNT_PATH)
+    response.raise_for_status()
+    total = int(response.json()["response"])
+
+    offset, page = 1, []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        offsets = range(1, total + 1, page_size)
+        for offset, page in zip(offsets, executor.map(
+                lambda offset: fetch_interface_page(client, offset, page_size), offsets)):
+            yield from page
+    if len(page) >= page_size:
+        yield from iter_pages(
+            lambda offset, limit: fetch_interface_page(client, offset, limit),
+            page_size=page_size, start=offset + page_size
+        )
+
+
+def group_interfaces(interfaces):
+    """
+    Groups interface records by deviceId. Returns {device_id: [interfaces]}
+    in the shape get_interface_stats() returns per device.
+    """
+    groups = {}
+    for interface in interfaces:
+        groups.setdefault(interface.get("deviceId"), []).append(interface)
+    return groups
+
+
+class DeviceIndex:
+    """
+    Hostname / management IP / serial number -> device ID lookup table.
+
+    The index is built from one inventory walk and trusted for ttl seconds.
+    Names missing from a fresh index are looked up with a server-side
+    hostname filter and added, so new devices do not force a full rebuild.
+    """
+
+    def __init__(self, client, ttl=INDEX_TTL):
+        self.client = client
+        self.ttl = ttl
+        self._ids = {}
+        self._built_at = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _add(ids, device):
+        for field in INDEX_FIELDS:
+            value = device.get(field)
+            if not value:
+                continue
+            # Stacked switches report their member serials comma separated
+            keys = value.split(",") if field == "serialNumber" else [value]
+            for key in keys:
+                ids[key.strip()] = device["id"]
+
+    def is_stale(self):
+        return self._built_at is None or time.monotonic() - self._built_at >= self.ttl
+
+    def build(self, devices=None):
+        """
+        Rebuilds the index from a full inventory walk, or from an already
+        fetched device list (e.g. the on-disk inventory cache).
+        """
+        ids = {}
+        for device in iter_devices(self.client) if devices is None else devices:
+            self._add(ids, device)
+        with self._lock:
+            self._ids = ids
+            self._built_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if self.is_stale():
+            self.build()
+
+    def resolve(self, name):
+        """
+        Returns the device ID for a hostname, management IP or serial number,
+        or None if the controller does not know it.
+        """
+        self._ensure_fresh()
+        device_id = self._ids.get(name)
+        if device_id is not None:
+            return device_id
+
+        for device in iter_devices(self.client, prefetch=False, params={"hostname": name}):
+            with self._lock:
+                self._add(self._ids, device)
+            if device.get("hostname") == name:
+                return device["id"]
+        return None
+
+    def resolve_many(self, names):
+        """
+        Resolves many names against one index build.
+        Returns a dict of name -> device ID (None for unknown names).
+        """
+        self._ensure_fresh()
+        ids = self._ids
+        return {name: ids.get(name) for name in names}
+
+
+_indexes = weakref.WeakKeyDictionary()
+
+
+def get_device_index(client, ttl=INDEX_TTL):
+    """
+    Returns the shared DeviceIndex for a client, creating it on first use.
+    """
+    index = _indexes.get(client)
+    if index is None:
+        index = _indexes[client] = DeviceIndex(client, ttl)
+    return index
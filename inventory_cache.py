@@ -0,0 +1,187 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from inventory import iter_devices
+from records import DeviceRecord, InterfaceRecord, record_default
+
+CACHE_PATH = os.environ.get(
+    "CATALYST_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "inventory_cache.sqlite3")
+)
+# A device list synced more recently than this is served from disk without
+# asking the controller at all
+CACHE_MAX_AGE = 10 * 60
+# Equipment (modules, serials, hardware versions) is refetched when the
+# device's change stamp or serial changes, and at the latest after this
+EQUIPMENT_MAX_AGE = 30 * 24 * 60 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS devices (
+    id TEXT PRIMARY KEY,
+    hostname TEXT,
+    stamp TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS interfaces (
+    device_id TEXT PRIMARY KEY,
+    stamp TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS equipment (
+    device_id TEXT PRIMARY KEY,
+    stamp TEXT,
+    serial TEXT,
+    fetched_at REAL NOT NULL,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def device_stamp(device):
+    """
+    Returns the controller's change stamp for a device record.
+    """
+    stamp = device.get("lastUpdateTime") or device.get("lastUpdated")
+    return None if stamp is None else str(stamp)
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(",", ":"), default=record_default)
+
+
+class InventoryCache:
+    """
+    SQLite cache of the device and interface inventory.
+
+    Devices are keyed by ID and stamped with the controller's lastUpdateTime.
+    A device's interface list is only refetched when that stamp changes,
+    its equipment list when the stamp or the serial number changes.
+
+    Cached interfaces are inventory metadata (IDs, names, port modes).
+    Operational state such as status or speed changes without a new stamp,
+    so reports showing it must fetch interfaces live.
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        # Stamps and serials seen during the current sync, before they are written back
+        self._stamps = {}
+        self._serials = {}
+
+    def age(self):
+        """
+        Seconds since the device list was last synced, or None if never.
+        """
+        with self._lock:
+            row = self.db.execute("SELECT value FROM meta WHERE key = 'synced_at'").fetchone()
+        return None if row is None else time.time() - float(row[0])
+
+    def load_devices(self):
+        with self._lock:
+            rows = self.db.execute("SELECT data FROM devices ORDER BY rowid").fetchall()
+        return [DeviceRecord.from_api(json.loads(data)) for (data,) in rows]
+
+    def sync_devices(self, client, max_age=CACHE_MAX_AGE):
+        """
+        Yields the device inventory.
+
+        If the last sync is younger than max_age seconds the devices come
+        straight from disk. Otherwise the controller inventory is streamed
+        and written back; devices that disappeared are dropped together with
+        their interfaces once the walk has completed.
+        """
+        age = self.age()
+        if max_age and age is not None and age < max_age:
+            yield from self.load_devices()
+            return
+
+        with self._lock:
+            known = {device_id for (device_id,) in self.db.execute("SELECT id FROM devices")}
+        rows = []
+        for device in iter_devices(client):
+            stamp = device_stamp(device)
+            self._stamps[device["id"]] = stamp
+            self._serials[device["id"]] = device.get("serialNumber")
+            rows.append((device["id"], device.get("hostname"), stamp, _dumps(device)))
+            yield device
+
+        gone = [(device_id,) for device_id in known - {row[0] for row in rows}]
+        with self._lock, self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO devices (id, hostname, stamp, data) VALUES (?, ?, ?, ?)", rows
+            )
+            self.db.executemany("DELETE FROM devices WHERE id = ?", gone)
+            self.db.executemany("DELETE FROM interfaces WHERE device_id = ?", gone)
+            self.db.executemany("DELETE FROM equipment WHERE device_id = ?", gone)
+            self.db.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('synced_at', ?)", (str(time.time()),)
+            )
+
+    def get_interfaces(self, device_id, fetch):
+        """
+        Returns the interface list of a device, calling fetch(device_id) only
+        if nothing is cached for the device's current change stamp. Only the
+        metadata fields of the returned interfaces are current.
+        """
+        with self._lock:
+            stamp = self._stamps.get(device_id)
+            if stamp is None:
+                row = self.db.execute("SELECT stamp FROM devices WHERE id = ?", (device_id,)).fetchone()
+                stamp = row and row[0]
+            cached = self.db.execute(
+                "SELECT stamp, data FROM interfaces WHERE device_id = ?", (device_id,)
+            ).fetchone()
+        if stamp is not None and cached is not None and cached[0] == stamp:
+            return InterfaceRecord.from_api_list(json.loads(cached[1]))
+
+        interfaces = fetch(device_id)
+        if stamp is not None and interfaces is not None:
+            with self._lock, self.db:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO interfaces (device_id, stamp, data) VALUES (?, ?, ?)",
+                    (device_id, stamp, _dumps(interfaces))
+                )
+        return interfaces
+
+    def get_equipment(self, device_id, fetch, max_age=EQUIPMENT_MAX_AGE):
+        """
+        Returns the equipment list of a device, calling fetch(device_id) only
+        if the device's change stamp or serial differs from the cached entry
+        or it is older than max_age seconds. fetch returns None when the
+        device does not support the endpoint; that answer is cached as well.
+        """
+        with self._lock:
+            stamp, serial = self._stamps.get(device_id), self._serials.get(device_id)
+            if stamp is None:
+                row = self.db.execute("SELECT stamp, data FROM devices WHERE id = ?", (device_id,)).fetchone()
+                if row is not None:
+                    stamp, serial = row[0], json.loads(row[1]).get("serialNumber")
+            cached = self.db.execute(
+                "SELECT stamp, serial, fetched_at, data FROM equipment WHERE device_id = ?", (device_id,)
+            ).fetchone()
+        if (stamp is not None and cached is not None and (cached[0], cached[1]) == (stamp, serial)
+                and time.time() - cached[2] < max_age):
+            return json.loads(cached[3]) if cached[3] is not None else None
+
+        equipment = fetch(device_id)
+        if stamp is not None:
+            with self._lock, self.db:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO equipment (device_id, stamp, serial, fetched_at, data) VALUES (?, ?, ?, ?, ?)",
+                    (device_id, stamp, serial, time.time(), None if equipment is None else _dumps(equipment))
+                )
+        return equipment
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,127 @@
+import codecs
+import json
+
+from metrics import METRICS
+
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\r\n"
+_NUMBER_CHARS = frozenset("0123456789+-.eE")
+
+
+class _Reader:
+    """
+    Text buffer over an iterator of byte chunks with JSON value decoding
+    that pulls more data whenever a value is cut off at the buffer end.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.json = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        if self.eof:
+            return False
+        # Drop the consumed prefix once it dominates the buffer
+        if self.pos > len(self.buf) // 2:
+            self.buf, self.pos = self.buf[self.pos:], 0
+        for chunk in self.chunks:
+            if chunk:
+                self.buf += self.decoder.decode(chunk)
+                return True
+        self.buf += self.decoder.decode(b"", final=True)
+        self.eof = True
+        return True
+
+    def peek(self):
+        """
+        Skips whitespace and returns the next character ("" at end of input).
+        """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos} of JSON response")
+        self.pos += 1
+
+    def value(self):
+        """
+        Decodes the next complete JSON value.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.json.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number cut at the buffer end (e.g. "1.5e") may continue in the next chunk
+            if (not self.eof and isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and all(char in _NUMBER_CHARS for char in self.buf[end:])):
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(chunks, key="response", record=None):
+    """
+    Yields the elements of the top-level key array of a JSON object one by
+    one while the body is still arriving. With a record class (see
+    records.py) each element is converted through record.from_api right
+    after it is parsed.
+    """
+    reader = _Reader(chunks)
+    reader.expect("{")
+    while reader.peek() != "}":
+        name = reader.value()
+        reader.expect(":")
+        if name != key:
+            reader.value()
+        elif reader.peek() == "n":
+            # {"response": null} holds no records, like an empty array
+            reader.value()
+            return
+        else:
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    element = reader.value()
+                    if record is not None and isinstance(element, dict):
+                        element = record.from_api(element)
+                    yield element
+                    if reader.peek() == ",":
+                        reader.pos += 1
+                        continue
+                    reader.expect("]")
+                    break
+            return
+        if reader.peek() == ",":
+            reader.pos += 1
+    raise KeyError(key)
+
+
+def iter_response_array(response, key="response", chunk_size=CHUNK_SIZE, record=None):
+    """
+    Streams the "response" array of a Catalyst Center reply. The request
+    must have been sent with stream=True for this to read off the socket.
+    Time spent reading and decoding the body counts as the parse phase.
+    """
+    try:
+        with METRICS.phase("parse"):
+            yield from iter_json_array(response.iter_content(chunk_size), key, record)
+    finally:
+        response.close()
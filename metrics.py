@@ -0,0 +1,212 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+# Upper bounds (seconds) of the request latency histogram buckets; a last
+# bucket catches everything slower
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Phases the scripts time. fetch is fed by the client (time to response
+# headers), parse by the streaming JSON reader, analyze and render by the
+# reporting code. throttle is time requests waited on the client's own
+# rate and concurrency limits.
+PHASES = ("fetch", "parse", "analyze", "render", "throttle")
+
+# Path segments that are IDs (UUIDs or numbers) collapse into {id}
+_ID_SEGMENT = re.compile(
+    r"/(?:[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|\d+)(?=/|$)"
+)
+_URL_PREFIX = re.compile(r"^[a-z]+://[^/]+")
+_NULL_TIMER = nullcontext()
+
+
+def endpoint_name(method, url):
+    """
+    Returns "METHOD /path/{id}/..." for a request URL, so all devices and
+    interfaces hitting the same API share one set of statistics.
+    """
+    path = _URL_PREFIX.sub("", url).split("?", 1)[0]
+    return f"{method} {_ID_SEGMENT.sub('/{id}', path)}"
+
+
+def _percentile(buckets, count, q):
+    if not count:
+        return None
+    target = q * count
+    seen = 0
+    for bound, hits in zip(LATENCY_BUCKETS + (float("inf"),), buckets):
+        seen += hits
+        if seen >= target:
+            return bound
+    return float("inf")
+
+
+def _format_bound(bound):
+    if bound is None:
+        return "-"
+    if bound == float("inf"):
+        return f">{LATENCY_BUCKETS[-1]:g}s"
+    return f"<={bound * 1000:g}ms" if bound < 1 else f"<={bound:g}s"
+
+
+class _PhaseTimer:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.add_phase(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    Process-wide request and phase statistics.
+
+    Disabled by default: every recording call then returns after one
+    attribute check and phase() hands out a shared no-op context manager.
+    Phase times are summed over all threads, so with parallel sweeps they
+    can exceed the wall time.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+            self._phases = {}
+            self._started = time.monotonic()
+
+    def _endpoint(self, endpoint):
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            stats = self._endpoints[endpoint] = {
+                "requests": 0,
+                "seconds": 0.0,
+                "bytes": 0,
+                "retries": 0,
+                "coalesced": 0,
+                "statuses": {},
+                "buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+            }
+        return stats
+
+    def record_request(self, endpoint, seconds, nbytes=0, status=None):
+        """
+        Records one request/response exchange; status is the HTTP status or
+        None when no response arrived. The time also counts as fetch phase.
+        """
+        if not self.enabled:
+            return
+        bucket = bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            stats = self._endpoint(endpoint)
+            stats["requests"] += 1
+            stats["seconds"] += seconds
+            stats["bytes"] += nbytes
+            stats["buckets"][bucket] += 1
+            stats["statuses"][status] = stats["statuses"].get(status, 0) + 1
+            self._add_phase("fetch", seconds)
+
+    def record_retry(self, endpoint):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._endpoint(endpoint)["retries"] += 1
+
+    def record_coalesced(self, endpoint):
+        """
+        Records a call answered by another caller's identical request.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._endpoint(endpoint)["coalesced"] += 1
+
+    def _add_phase(self, name, seconds):
+        phase = self._phases.get(name)
+        if phase is None:
+            phase = self._phases[name] = {"seconds": 0.0, "count": 0}
+        phase["seconds"] += seconds
+        phase["count"] += 1
+
+    def add_phase(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._add_phase(name, seconds)
+
+    def phase(self, name):
+        """
+        Context manager adding the time spent inside it to the named phase.
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _PhaseTimer(self, name)
+
+    def snapshot(self):
+        """
+        Returns a copy of all statistics:
+        {"uptime": s, "endpoints": {name: {...}}, "phases": {name: {...}}}.
+        Endpoint "buckets" align with LATENCY_BUCKETS plus one overflow bucket.
+        """
+        with self._lock:
+            endpoints = {
+                name: dict(stats, statuses=dict(stats["statuses"]), buckets=list(stats["buckets"]))
+                for name, stats in self._endpoints.items()
+            }
+            phases = {name: dict(phase) for name, phase in self._phases.items()}
+            uptime = time.monotonic() - self._started
+        return {"uptime": uptime, "endpoints": endpoints, "phases": phases}
+
+    def summary(self):
+        """
+        Returns the statistics as a printable text report.
+        """
+        snapshot = self.snapshot()
+        lines = [f"Run time {snapshot['uptime']:.2f}s", ""]
+        lines.append(
+            f"{'Endpoint':<60} {'Requests':>8} {'Retries':>7} {'Shared':>7} {'MiB':>8} {'Avg ms':>8} {'p50':>9} {'p95':>9} {'p99':>9}"
+        )
+        endpoints = sorted(snapshot["endpoints"].items(), key=lambda item: item[1]["seconds"], reverse=True)
+        for name, stats in endpoints:
+            count = stats["requests"]
+            average = stats["seconds"] / count * 1000 if count else 0
+            percentiles = [_format_bound(_percentile(stats["buckets"], count, q)) for q in (0.5, 0.95, 0.99)]
+            lines.append(
+                f"{name[:60]:<60} {count:>8} {stats['retries']:>7} {stats['coalesced']:>7} {stats['bytes'] / 2 ** 20:>8.2f} "
+                f"{average:>8.1f} {percentiles[0]:>9} {percentiles[1]:>9} {percentiles[2]:>9}"
+            )
+            failures = {status: hits for status, hits in stats["statuses"].items() if status is None or status >= 400}
+            if failures:
+                lines.append("    failed: " + ", ".join(
+                    f"{'no response' if status is None else status} x{hits}" for status, hits in failures.items()
+                ))
+        lines.append("")
+        lines.append(f"{'Phase':<10} {'Seconds':>10} {'Count':>8}")
+        names = list(PHASES) + sorted(set(snapshot["phases"]) - set(PHASES))
+        for name in names:
+            phase = snapshot["phases"].get(name)
+            if phase:
+                lines.append(f"{name:<10} {phase['seconds']:>10.3f} {phase['count']:>8}")
+        return "\n".join(lines)
+
+
+METRICS = Metrics()
+
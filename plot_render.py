@@ -0,0 +1,109 @@
+import math
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+PLOT_DIR = "plots"
+PLOT_FORMAT = "png"
+# Dashboard grid width and the most panels (devices) it will show
+DASHBOARD_COLUMNS = 4
+DASHBOARD_MAX_PANELS = 48
+
+
+def _pyplot():
+    # Non-interactive backend: never opens a window, safe in worker processes
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _draw_bars(ax, title, port_names, values, ylabel):
+    ax.bar(port_names, values, color='blue')
+    ax.set_xlabel('Interface Port Names')
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.tick_params(axis='x', rotation=45)
+
+
+def render_crc_plot(path, title, port_names, values, ylabel='CRC Error Count'):
+    """
+    Renders one CRC bar chart to path. Runs in a worker process.
+    """
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(10, 5))
+    _draw_bars(ax, title, port_names, values, ylabel)
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+    return path
+
+
+def render_dashboard(path, panels, columns=DASHBOARD_COLUMNS):
+    """
+    Renders [(title, port_names, values, ylabel), ...] as one multi-panel
+    figure. Runs in a worker process.
+    """
+    plt = _pyplot()
+    rows = max(1, math.ceil(len(panels) / columns))
+    fig, axes = plt.subplots(rows, columns, figsize=(5 * columns, 3.5 * rows), squeeze=False)
+    for ax in axes.flat[len(panels):]:
+        ax.set_visible(False)
+    for ax, (title, port_names, values, ylabel) in zip(axes.flat, panels):
+        _draw_bars(ax, title, port_names, values, ylabel)
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+    return path
+
+
+def _file_name(name):
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", name)
+
+
+class PlotRenderer:
+    """
+    Writes CRC plots to image files on a process pool, so rendering
+    overlaps with data collection instead of blocking it on plt.show().
+    In dashboard mode the per-device charts are collected and rendered as
+    one multi-panel image when the renderer is closed.
+    """
+
+    def __init__(self, out_dir=PLOT_DIR, fmt=PLOT_FORMAT, dashboard=False, workers=None):
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self.dashboard = dashboard
+        self.panels = []
+        self.futures = []
+        os.makedirs(out_dir, exist_ok=True)
+        # Workers start lazily, while the sweep's request threads are running;
+        # forking a multithreaded process can deadlock the child
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("forkserver"))
+
+    def plot_crc(self, device_name, port_names, values, ylabel='CRC Error Count'):
+        if not port_names:
+            return
+        title = f"{device_name}: Top {len(port_names)} Interfaces with CRC Errors"
+        if self.dashboard:
+            self.panels.append((title, list(port_names), list(values), ylabel))
+            return
+        path = os.path.join(self.out_dir, f"crc_{_file_name(device_name)}.{self.fmt}")
+        self.futures.append(self.executor.submit(render_crc_plot, path, title, list(port_names), list(values), ylabel))
+
+    def close(self):
+        """
+        Waits for all pending renders and returns the written file paths.
+        """
+        if self.dashboard and self.panels:
+            panels = sorted(self.panels, key=lambda panel: max(panel[2]), reverse=True)[:DASHBOARD_MAX_PANELS]
+            path = os.path.join(self.out_dir, f"crc_dashboard.{self.fmt}")
+            self.futures.append(self.executor.submit(render_dashboard, path, panels))
+        paths = []
+        for future in self.futures:
+            try:
+                paths.append(future.result())
+            except Exception as err:
+                print(f"Failed to render plot: {err}")
+        self.executor.shutdown()
+        return paths
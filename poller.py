@@ -0,0 +1,193 @@
+import heapq
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+import requests
+
+from inventory import iter_devices
+from records import InterfaceRecord, ErrorRecord
+
+ENDPOINTS = {
+    "interfaces": "/dna/intent/api/v1/interface/network-device/{device_id}",
+    "errors": "/dna/intent/api/v1/interface/network-device/{device_id}/errors",
+    "equipment": "/dna/intent/api/v1/network-device/{device_id}/equipment",
+}
+# Record class per endpoint, matching what the sweeps request so that
+# overlapping polls and sweeps share requests (equipment stays plain dicts)
+RECORDS = {"interfaces": InterfaceRecord, "errors": ErrorRecord}
+# Default polling interval per endpoint class, in seconds
+INTERVALS = {
+    "interfaces": 15 * 60,
+    "errors": 5 * 60,
+    "equipment": 24 * 60 * 60,
+}
+# Each next poll lands within +/- this fraction of its interval
+JITTER = 0.1
+INVENTORY_INTERVAL = 30 * 60
+# Retry delay after a failed inventory refresh
+INVENTORY_RETRY = 60
+REPORT_INTERVAL = 60
+POLL_WORKERS = 16
+
+
+def fetch_endpoint(client, endpoint, device_id):
+    """
+    Fetches one endpoint class for a device. Returns None for equipment on
+    devices that do not support it (400), raises on other HTTP errors.
+    """
+    missing = (400,) if endpoint == "equipment" else ()
+    return client.get_records(
+        ENDPOINTS[endpoint].format(device_id=device_id), record=RECORDS.get(endpoint), missing=missing
+    )
+
+
+class Poller:
+    """
+    Long-running scheduler that polls every device per endpoint class.
+
+    Each (device, endpoint) pair has its own next-due time in a heap. First
+    polls are spread randomly over the interval and every reschedule adds
+    jitter, so the controller sees a steady trickle instead of a burst on
+    the minute. The client is reused for the whole run, so its token and
+    keep-alive connections stay warm between cycles. Schedule lag, the
+    delay between a poll's due time and its start, is tracked and reported.
+    """
+
+    def __init__(self, client, on_result=None, intervals=INTERVALS, jitter=JITTER,
+                 workers=POLL_WORKERS, inventory_interval=INVENTORY_INTERVAL,
+                 report_interval=REPORT_INTERVAL, fetch=fetch_endpoint, list_devices=None):
+        self.client = client
+        self.on_result = on_result or (lambda device, endpoint, result: None)
+        self.intervals = dict(intervals)
+        self.jitter = jitter
+        self.workers = workers
+        self.inventory_interval = inventory_interval
+        self.report_interval = report_interval
+        self.fetch = fetch
+        # Callable returning the device inventory; defaults to a paged walk
+        self.list_devices = list_devices or (lambda: iter_devices(client))
+
+        self.devices = {}
+        self._heap = []
+        self._seq = count()
+        # Current schedule generation per (device, endpoint); heap entries of
+        # an older generation are stale and skipped when they come due
+        self._generations = {}
+        self._slots = threading.BoundedSemaphore(workers)
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._stats = {"polls": 0, "failures": 0, "lag_total": 0.0, "lag_max": 0.0}
+
+    def _schedule(self, due, device_id, endpoint, generation):
+        heapq.heappush(self._heap, (due, next(self._seq), device_id, endpoint, generation))
+
+    def _next_due(self, due, endpoint, now):
+        interval = self.intervals[endpoint]
+        next_due = due + interval * (1 + random.uniform(-self.jitter, self.jitter))
+        if next_due < now:
+            # Fell more than a whole interval behind: re-spread instead of bursting to catch up
+            next_due = now + random.uniform(0, interval)
+        return next_due
+
+    def refresh_inventory(self):
+        """
+        Reloads the device list, scheduling new devices at a random offset
+        within each interval. Removed devices drop out when next due. A
+        device that comes back gets a new schedule generation, so entries
+        left from before it dropped out never poll it a second time.
+        """
+        now = time.monotonic()
+        devices = {device["id"]: device for device in self.list_devices()}
+        for device_id in self.devices.keys() - devices.keys():
+            for endpoint in self.intervals:
+                self._generations.pop((device_id, endpoint), None)
+        for device_id in devices.keys() - self.devices.keys():
+            for endpoint, interval in self.intervals.items():
+                generation = self._generations[(device_id, endpoint)] = next(self._seq)
+                self._schedule(now + random.uniform(0, interval), device_id, endpoint, generation)
+        self.devices = devices
+
+    def _poll(self, device, endpoint):
+        try:
+            result = self.fetch(self.client, endpoint, device["id"])
+            self.on_result(device, endpoint, result)
+        except requests.exceptions.RequestException as err:
+            with self._stats_lock:
+                self._stats["failures"] += 1
+            print(f"[{endpoint}] {device.get('hostname', device['id'])}: {err}")
+        except Exception as err:
+            with self._stats_lock:
+                self._stats["failures"] += 1
+            print(f"[{endpoint}] {device.get('hostname', device['id'])}: unexpected error: {err}")
+        finally:
+            self._slots.release()
+
+    def stats(self):
+        """
+        Returns poll count, failures and schedule lag since the last report.
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["lag_avg"] = stats["lag_total"] / stats["polls"] if stats["polls"] else 0.0
+        stats["devices"] = len(self.devices)
+        stats["scheduled"] = len(self._heap)
+        return stats
+
+    def report(self):
+        stats = self.stats()
+        with self._stats_lock:
+            self._reset_stats()
+        print(f"Scheduler: {stats['devices']} devices, {stats['polls']} polls, {stats['failures']} failed, "
+              f"lag avg {stats['lag_avg']:.2f}s max {stats['lag_max']:.2f}s")
+
+    def run(self, stop=None):
+        """
+        Polls until stop (a threading.Event) is set.
+        """
+        stop = stop or threading.Event()
+        # The first inventory load happens in the loop, so a controller that
+        # is down at startup is retried instead of ending the thread
+        next_inventory = time.monotonic()
+        next_report = time.monotonic() + self.report_interval
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while not stop.is_set():
+                now = time.monotonic()
+                if now >= next_inventory:
+                    next_inventory = now + self.inventory_interval
+                    try:
+                        self.refresh_inventory()
+                    except requests.exceptions.RequestException as err:
+                        print(f"Inventory refresh failed: {err}")
+                        next_inventory = now + min(self.inventory_interval, INVENTORY_RETRY)
+                    except Exception as err:
+                        print(f"Inventory refresh failed: unexpected error: {err}")
+                        next_inventory = now + min(self.inventory_interval, INVENTORY_RETRY)
+                if now >= next_report:
+                    self.report()
+                    next_report = now + self.report_interval
+
+                if not self._heap or self._heap[0][0] > now:
+                    due = self._heap[0][0] if self._heap else next_report
+                    stop.wait(max(0.0, min(due, next_inventory, next_report) - now))
+                    continue
+
+                due, _, device_id, endpoint, generation = heapq.heappop(self._heap)
+                device = self.devices.get(device_id)
+                if device is None or self._generations.get((device_id, endpoint)) != generation:
+                    continue
+                # Bound in-flight polls; waiting here shows up as schedule lag
+                self._slots.acquire()
+                started = time.monotonic()
+                lag = started - due
+                with self._stats_lock:
+                    self._stats["polls"] += 1
+                    self._stats["lag_total"] += lag
+                    self._stats["lag_max"] = max(self._stats["lag_max"], lag)
+                executor.submit(self._poll, device, endpoint)
+                self._schedule(self._next_due(due, endpoint, started), device_id, endpoint, generation)
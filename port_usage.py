@@ -0,0 +1,139 @@
+import time
+
+import numpy as np
+
+# Analysis window and resolution for the 30-day port usage statistics
+USAGE_DAYS = 30
+BUCKET_SECONDS = 60 * 60
+# Sample fields read from /interface/{id}/statistics; traffic is their sum
+TIME_FIELD = "timestamp"
+TRAFFIC_FIELDS = ("inputBytes", "outputBytes")
+# A bucket with more traffic than this counts as active
+ACTIVE_THRESHOLD = 0
+
+
+def _sample_traffic(sample):
+    return sum(float(sample.get(field) or 0) for field in TRAFFIC_FIELDS)
+
+
+def build_usage_matrix(series, end_time=None, days=USAGE_DAYS, bucket=BUCKET_SECONDS):
+    """
+    Loads usage samples for many ports into aligned NumPy arrays.
+
+    series yields (key, samples) pairs, samples being the list returned by
+    get_interface_usage() (or None). Returns a dict with the port keys, a
+    (ports x buckets) traffic matrix, a matching per-bucket sample count
+    and the window start in epoch seconds.
+    """
+    end_time = time.time() if end_time is None else end_time
+    n_buckets = int(days * 24 * 3600 // bucket)
+    start = end_time - n_buckets * bucket
+
+    keys, rows, stamps, values = [], [], [], []
+    for row, (key, samples) in enumerate(series):
+        keys.append(key)
+        for sample in samples or ():
+            stamp = sample.get(TIME_FIELD)
+            if stamp is None:
+                continue
+            rows.append(row)
+            stamps.append(stamp)
+            values.append(_sample_traffic(sample))
+
+    rows = np.asarray(rows, dtype=np.int64)
+    stamps = np.asarray(stamps, dtype=np.float64) / 1000.0  # API timestamps are in ms
+    values = np.asarray(values, dtype=np.float64)
+    cols = np.floor((stamps - start) / bucket).astype(np.int64)
+    inside = (cols >= 0) & (cols < n_buckets)
+    flat = rows[inside] * n_buckets + cols[inside]
+
+    size = len(keys) * n_buckets
+    traffic = np.bincount(flat, weights=values[inside], minlength=size).reshape(len(keys), n_buckets)
+    counts = np.bincount(flat, minlength=size).reshape(len(keys), n_buckets)
+    return {"keys": keys, "traffic": traffic, "counts": counts, "start": start, "bucket": bucket}
+
+
+def analyze_usage(matrix, threshold=ACTIVE_THRESHOLD):
+    """
+    Computes per-port active time for a usage matrix in one vectorized pass.
+
+    Returns a dict of arrays aligned with matrix["keys"]: active_pct (share
+    of buckets with data that saw traffic), longest_idle_hours,
+    current_idle_hours, last_active (epoch seconds, NaN if never active)
+    and observed (number of buckets with samples). Buckets without samples
+    count as idle.
+    """
+    traffic, counts, bucket = matrix["traffic"], matrix["counts"], matrix["bucket"]
+    n_buckets = traffic.shape[1]
+    active = (traffic > threshold) & (counts > 0)
+
+    observed = (counts > 0).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        active_pct = np.where(observed > 0, active.sum(axis=1) * 100.0 / observed, 0.0)
+
+    # Idle streak length at each bucket = distance to the last active bucket
+    idx = np.arange(n_buckets)
+    last_seen = np.maximum.accumulate(np.where(active, idx, -1), axis=1)
+    streak = idx - last_seen
+    hours = bucket / 3600.0
+    last_idx = last_seen[:, -1]
+    last_active = np.where(last_idx >= 0, matrix["start"] + (last_idx + 1) * bucket, np.nan)
+
+    return {
+        "keys": matrix["keys"],
+        "active_pct": active_pct,
+        "longest_idle_hours": streak.max(axis=1) * hours,
+        "current_idle_hours": streak[:, -1] * hours,
+        "last_active": last_active,
+        "observed": observed,
+    }
+
+
+def concat_reports(reports):
+    """
+    Joins analyze_usage() reports of separate batches of ports (e.g. one per
+    device) into one report.
+    """
+    reports = list(reports)
+    joined = {"keys": [key for report in reports for key in report["keys"]]}
+    for field in ("active_pct", "longest_idle_hours", "current_idle_hours", "last_active", "observed"):
+        joined[field] = np.concatenate([report[field] for report in reports]) if reports else np.zeros(0)
+    return joined
+
+
+def unused_ports(report, interfaces, min_idle_days=USAGE_DAYS):
+    """
+    Returns the keys of access ports idle for at least min_idle_days.
+
+    interfaces maps each key to its interface record; a port is an access
+    port if its portMode is "access". Ports without any samples are not
+    reported, since no data says nothing about traffic (see
+    ports_without_data).
+    """
+    access = np.fromiter(
+        ((interfaces.get(key) or {}).get("portMode") == "access" for key in report["keys"]),
+        dtype=bool,
+        count=len(report["keys"])
+    )
+    idle = report["current_idle_hours"] >= min_idle_days * 24
+    return [report["keys"][i] for i in np.flatnonzero(access & idle & (report["observed"] > 0))]
+
+
+def ports_without_data(report):
+    """
+    Returns the keys of ports without a single usage sample in the window,
+    e.g. because the controller had no statistics for them or the fetch failed.
+    """
+    return [report["keys"][i] for i in np.flatnonzero(report["observed"] == 0)]
+
+
+def print_port_usage(report):
+    print(f"\nPort usage over the last {USAGE_DAYS} days:")
+    for i, key in enumerate(report["keys"]):
+        if not report["observed"][i]:
+            print(f"{key}: no usage data")
+            continue
+        last_active = report["last_active"][i]
+        last = "never" if np.isnan(last_active) else time.strftime("%Y-%m-%d %H:%M", time.gmtime(last_active))
+        print(f"{key}: active {report['active_pct'][i]:.1f}%, "
+              f"longest idle {report['longest_idle_hours'][i]:.0f}h, last active {last}")
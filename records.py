@@ -0,0 +1,133 @@
+import sys
+
+
+class Record:
+    """
+    Compact, slotted view of one API record.
+
+    FIELDS maps API field names to attribute names; only those fields are
+    kept. String values of the attributes in INTERNED repeat across many
+    records (status, duplex, speed, ...) and are interned so all records
+    share one copy. get() and [] accept the API field names, so reporting
+    code written against the raw dicts keeps working.
+    """
+
+    __slots__ = ()
+    FIELDS = {}
+    INTERNED = frozenset()
+
+    @classmethod
+    def from_api(cls, data):
+        if isinstance(data, cls):
+            return data
+        record = cls.__new__(cls)
+        interned = cls.INTERNED
+        for field, attr in cls.FIELDS.items():
+            value = data.get(field)
+            if attr in interned and type(value) is str:
+                value = sys.intern(value)
+            setattr(record, attr, value)
+        return record
+
+    @classmethod
+    def from_api_list(cls, items):
+        return [cls.from_api(item) for item in items or ()]
+
+    def get(self, field, default=None):
+        attr = self.FIELDS.get(field)
+        value = None if attr is None else getattr(self, attr)
+        return default if value is None else value
+
+    def __getitem__(self, field):
+        attr = self.FIELDS.get(field)
+        if attr is None:
+            raise KeyError(field)
+        return getattr(self, attr)
+
+    def __contains__(self, field):
+        return field in self.FIELDS
+
+    def to_dict(self):
+        """
+        Returns the record as an API-style dict (e.g. for JSON caches).
+        """
+        return {field: getattr(self, attr) for field, attr in self.FIELDS.items()}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class DeviceRecord(Record):
+    FIELDS = {
+        "id": "id",
+        "hostname": "hostname",
+        "managementIpAddress": "management_ip",
+        "serialNumber": "serial_number",
+        "platformId": "platform_id",
+        "family": "family",
+        "type": "type",
+        "softwareVersion": "software_version",
+        "reachabilityStatus": "reachability_status",
+        "lastUpdateTime": "last_update_time",
+        "lastUpdated": "last_updated",
+        "locationName": "location_name",
+        "location": "location",
+        "siteId": "site_id",
+        # Not an API field: set by federation.Cluster.tag()
+        "cluster": "cluster",
+    }
+    INTERNED = frozenset([
+        "platform_id", "family", "type", "software_version", "reachability_status",
+        "location_name", "location", "site_id", "cluster",
+    ])
+    __slots__ = tuple(FIELDS.values())
+
+
+class InterfaceRecord(Record):
+    FIELDS = {
+        "id": "id",
+        "deviceId": "device_id",
+        "portName": "port_name",
+        "status": "status",
+        "adminStatus": "admin_status",
+        "macAddress": "mac_address",
+        "speed": "speed",
+        "duplex": "duplex",
+        "mtu": "mtu",
+        "vlanId": "vlan_id",
+        "ipv4Address": "ipv4_address",
+        "ipv4Mask": "ipv4_mask",
+        "portMode": "port_mode",
+        "interfaceType": "interface_type",
+        "lastInput": "last_input",
+        "lastOutput": "last_output",
+        "lastUpdated": "last_updated",
+        "crcErrorCount": "crc_error_count",
+    }
+    INTERNED = frozenset([
+        "device_id", "status", "admin_status", "speed", "duplex", "mtu", "vlan_id",
+        "ipv4_mask", "port_mode", "interface_type", "last_input", "last_output",
+    ])
+    __slots__ = tuple(FIELDS.values())
+
+
+class ErrorRecord(Record):
+    FIELDS = {
+        "id": "id",
+        "deviceId": "device_id",
+        "portName": "port_name",
+        "crcErrors": "crc_errors",
+        "inputErrors": "input_errors",
+        "outputErrors": "output_errors",
+    }
+    INTERNED = frozenset(["device_id"])
+    __slots__ = tuple(FIELDS.values())
+
+
+def record_default(value):
+    """
+    json.dumps default hook that serializes records as API-style dicts.
+    """
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,94 @@
+import csv
+import json
+import sys
+
+# (header, API field, fixed text width) for every reported interface column
+INTERFACE_COLUMNS = [
+    ("Port Name", "portName", 32),
+    ("Status", "status", 6),
+    ("Admin Status", "adminStatus", 12),
+    ("MAC Address", "macAddress", 17),
+    ("Speed", "speed", 10),
+    ("Duplex", "duplex", 10),
+    ("MTU", "mtu", 5),
+    ("VLAN ID", "vlanId", 7),
+    ("IP Address", "ipv4Address", 15),
+    ("IP Mask", "ipv4Mask", 15),
+]
+DEVICE_COLUMN = ("Device", "device", 32)
+# Leading column added when the fleet spans several controllers
+CLUSTER_COLUMN = ("Cluster", "cluster", 12)
+FORMATS = ["csv", "ndjson", "text"]
+
+
+def interface_row(interface):
+    return [interface.get(field, "N/A") for _, field, _ in INTERFACE_COLUMNS]
+
+
+class CsvReport:
+    """
+    Writes one CSV line per interface as soon as it is produced.
+    """
+
+    def __init__(self, stream, cluster=False):
+        self.stream = stream
+        self.cluster = cluster
+        self.writer = csv.writer(stream)
+        leading = [CLUSTER_COLUMN[0]] if cluster else []
+        self.writer.writerow(leading + [DEVICE_COLUMN[0]] + [header for header, _, _ in INTERFACE_COLUMNS])
+
+    def write(self, device_name, interface, cluster=None):
+        leading = [cluster] if self.cluster else []
+        self.writer.writerow(leading + [device_name] + interface_row(interface))
+
+
+class NdjsonReport:
+    """
+    Writes one JSON object per line, keyed by the API field names.
+    """
+
+    def __init__(self, stream, cluster=False):
+        self.stream = stream
+        self.cluster = cluster
+
+    def write(self, device_name, interface, cluster=None):
+        record = {CLUSTER_COLUMN[1]: cluster} if self.cluster else {}
+        record[DEVICE_COLUMN[1]] = device_name
+        for _, field, _ in INTERFACE_COLUMNS:
+            record[field] = interface.get(field)
+        self.stream.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+class TextReport:
+    """
+    Fixed-width text columns. Widths are set up front, so no pass over the
+    data is needed before the first row; longer values are truncated.
+    """
+
+    def __init__(self, stream, cluster=False):
+        self.stream = stream
+        self.cluster = cluster
+        columns = ([CLUSTER_COLUMN] if cluster else []) + [DEVICE_COLUMN] + INTERFACE_COLUMNS
+        self.widths = [width for _, _, width in columns]
+        self._line([header for header, _, _ in columns])
+        self._line(["-" * width for width in self.widths])
+
+    def _line(self, values):
+        self.stream.write(" ".join(
+            str(value)[:width].ljust(width) for value, width in zip(values, self.widths)
+        ).rstrip() + "\n")
+
+    def write(self, device_name, interface, cluster=None):
+        leading = [cluster] if self.cluster else []
+        self._line(leading + [device_name] + interface_row(interface))
+
+
+REPORTS = {"csv": CsvReport, "ndjson": NdjsonReport, "text": TextReport}
+
+
+def open_report(fmt, stream=None, cluster=False):
+    """
+    Returns a streaming interface report writer for one of FORMATS. With
+    cluster, every row starts with the controller cluster it came from.
+    """
+    return REPORTS[fmt](stream or sys.stdout, cluster)
@@ -0,0 +1,392 @@
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+# Default synthetic fleet and controller behaviour
+DEVICES = 1000
+PORTS_PER_DEVICE = 48
+SITES = 25
+SEED = 1
+# Server-side delay per request: latency plus up to jitter seconds
+LATENCY = 0.0
+JITTER = 0.0
+# Requests per second the controller accepts before answering 429 (0 = no limit)
+RATE_LIMIT = 0
+# Share of API requests answered with a random 5xx
+ERROR_RATE = 0.0
+TOKEN_TTL = 60 * 60
+MAX_PAGE_SIZE = 500
+HOST = "127.0.0.1"
+PORT = 8443
+
+FAMILIES = ["Switches and Hubs", "Switches and Hubs", "Routers", "Wireless Controller"]
+PLATFORMS = {
+    "Switches and Hubs": "C9300-48P",
+    "Routers": "ISR4451-X/K9",
+    "Wireless Controller": "C9800-40-K9",
+}
+# Families that answer 400 on /equipment, like the sandbox does
+NO_EQUIPMENT = {"Wireless Controller"}
+SAMPLE_SECONDS = 60 * 60
+
+ROUTES = [
+    ("auth", "POST", re.compile(r"^/dna/system/api/v1/auth/token$")),
+    ("devices", "GET", re.compile(r"^/dna/intent/api/v1/network-device$")),
+    ("interface_list", "GET", re.compile(r"^/dna/intent/api/v1/interface$")),
+    ("interface_count", "GET", re.compile(r"^/dna/intent/api/v1/interface/count$")),
+    ("equipment", "GET", re.compile(r"^/dna/intent/api/v1/network-device/([^/]+)/equipment$")),
+    ("interfaces", "GET", re.compile(r"^/dna/intent/api/v1/interface/network-device/([^/]+)$")),
+    ("errors", "GET", re.compile(r"^/dna/intent/api/v1/interface/network-device/([^/]+)/errors$")),
+    ("statistics", "GET", re.compile(r"^/dna/intent/api/v1/interface/([^/]+)/statistics$")),
+]
+
+
+class Fleet:
+    """
+    Deterministic synthetic inventory. Devices are generated up front;
+    interfaces, counters and statistics are derived from the seed on
+    request, so large fleets cost little memory.
+    """
+
+    def __init__(self, devices=DEVICES, ports=PORTS_PER_DEVICE, sites=SITES, seed=SEED):
+        self.ports = ports
+        self.seed = seed
+        # CRC counters grow from this moment, so repeated polls see new errors
+        self.started = time.time()
+        updated = int(self.started * 1000)
+        self.devices = []
+        self.by_id = {}
+        for index in range(devices):
+            family = FAMILIES[index % len(FAMILIES)]
+            device = {
+                "id": str(uuid.UUID(int=(seed << 64) | index)),
+                "hostname": f"sim-{index:05d}.example.net",
+                "managementIpAddress": f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}",
+                "serialNumber": f"SIM{seed:03d}{index:07d}",
+                "platformId": PLATFORMS[family],
+                "family": family,
+                "type": f"Cisco {PLATFORMS[family]}",
+                "softwareVersion": "17.9.4",
+                "reachabilityStatus": "Reachable",
+                "lastUpdateTime": updated,
+                "locationName": f"Site-{index % sites:03d}",
+            }
+            self.devices.append(device)
+            self.by_id[device["id"]] = (index, device)
+
+    def _rng(self, index, salt):
+        return random.Random(f"{self.seed}:{index}:{salt}")
+
+    def _interface_id(self, index, port):
+        return str(uuid.UUID(int=(self.seed << 96) | (index << 16) | port))
+
+    def device(self, device_id):
+        entry = self.by_id.get(device_id)
+        return None if entry is None else entry[0]
+
+    def list_devices(self, offset, limit, hostname=None):
+        if hostname is not None:
+            return [device for device in self.devices if device["hostname"] == hostname]
+        return self.devices[offset - 1:offset - 1 + limit]
+
+    def list_interfaces(self, offset, limit):
+        """
+        One page of the global interface listing, ordered by device.
+        """
+        first = offset - 1
+        last = min(first + limit, len(self.devices) * self.ports)
+        interfaces = []
+        for index in range(first // self.ports, (last - 1) // self.ports + 1 if last > first else 0):
+            interfaces.extend(self.interfaces(index))
+        skip = first - first // self.ports * self.ports
+        return interfaces[skip:skip + last - first]
+
+    def interfaces(self, index):
+        rng = self._rng(index, "interfaces")
+        device_id = self.devices[index]["id"]
+        interfaces = []
+        for port in range(1, self.ports + 1):
+            up = rng.random() < 0.7
+            interfaces.append({
+                "id": self._interface_id(index, port),
+                "deviceId": device_id,
+                "portName": f"GigabitEthernet1/0/{port}",
+                "status": "up" if up else "down",
+                "adminStatus": "UP" if up or rng.random() < 0.5 else "DOWN",
+                "macAddress": f"00:5e:{index >> 8 & 255:02x}:{index & 255:02x}:{port >> 8 & 255:02x}:{port & 255:02x}",
+                "speed": "1000000" if up else "10000",
+                "duplex": "FullDuplex" if up else "AutoNegotiate",
+                "mtu": "1500",
+                "vlanId": str(rng.choice([1, 10, 20, 30])),
+                "ipv4Address": None,
+                "ipv4Mask": None,
+                "portMode": "access" if port < self.ports - 1 else "trunk",
+                "interfaceType": "Physical",
+                "lastUpdated": str(self.devices[index]["lastUpdateTime"]),
+                "description": "",
+                "className": "SwitchPort",
+                "pid": self.devices[index]["platformId"],
+                "serialNo": self.devices[index]["serialNumber"],
+            })
+        return interfaces
+
+    def errors(self, index, now=None):
+        rng = self._rng(index, "errors")
+        hours = ((time.time() if now is None else now) - self.started) / 3600
+        device_id = self.devices[index]["id"]
+        errors = []
+        for port in range(1, self.ports + 1):
+            # Most ports are clean; a few have a base count and keep erroring
+            base = rng.randrange(1000) if rng.random() < 0.1 else 0
+            rate = rng.choice([0, 0, 0, 0, 5, 50, 500]) if base else 0
+            errors.append({
+                "id": self._interface_id(index, port),
+                "deviceId": device_id,
+                "portName": f"GigabitEthernet1/0/{port}",
+                "crcErrors": base + int(rate * hours),
+                "inputErrors": base,
+                "outputErrors": 0,
+            })
+        return errors
+
+    def equipment(self, index):
+        device = self.devices[index]
+        if device["family"] in NO_EQUIPMENT:
+            return None
+        return [
+            {"name": "Chassis", "description": device["type"], "serialNumber": device["serialNumber"]},
+            {"name": "Power Supply 1", "description": "PWR-C1-715WAC", "serialNumber": f"PS{index:09d}"},
+        ]
+
+    def statistics(self, interface_id, start_ms, end_ms):
+        value = uuid.UUID(interface_id).int
+        index, port = value >> 16 & 0xFFFFFFFF, value & 0xFFFF
+        if index >= len(self.devices) or not 1 <= port <= self.ports:
+            return None
+        rng = self._rng(index, f"usage:{port}")
+        idle = rng.random() < 0.2
+        level = rng.randrange(1, 10 ** 6)
+        step = SAMPLE_SECONDS * 1000
+        first = (start_ms + step - 1) // step * step
+        return [
+            {
+                "timestamp": stamp,
+                "inputBytes": 0 if idle else level,
+                "outputBytes": 0 if idle else level // 2,
+            }
+            for stamp in range(first, end_ms, step)
+        ]
+
+
+class RateLimiter:
+    """
+    Non-blocking token bucket: allow() says whether a request fits.
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def allow(self):
+        if not self.rate:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this Nagle stalls keep-alive replies
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, payload=None, headers=None):
+        body = b"" if payload is None else json.dumps(payload, separators=(",", ":")).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count(status, len(body))
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        self._handle("POST")
+
+    def _handle(self, method):
+        server = self.server
+        url = urlsplit(self.path)
+        for name, route_method, pattern in ROUTES:
+            match = pattern.match(url.path)
+            if match and route_method == method:
+                break
+        else:
+            return self._reply(404, {"error": "Not found"})
+
+        if server.latency or server.jitter:
+            time.sleep(server.latency + random.random() * server.jitter)
+        if not server.limiter.allow():
+            return self._reply(429, {"error": "Too many requests"}, {"Retry-After": "1"})
+        if name == "auth":
+            return self._reply(200, {"Token": server.issue_token()})
+        if not server.check_token(self.headers.get("X-Auth-Token")):
+            return self._reply(401, {"error": "Unauthorized"})
+        if server.error_rate and random.random() < server.error_rate:
+            return self._reply(random.choice([500, 502, 503]), {"error": "Injected failure"})
+
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        fleet = server.fleet
+        if name == "devices":
+            offset = max(1, int(query.get("offset", 1)))
+            limit = min(MAX_PAGE_SIZE, int(query.get("limit", MAX_PAGE_SIZE)))
+            return self._reply(200, {"response": fleet.list_devices(offset, limit, query.get("hostname"))})
+        if name == "interface_list":
+            offset = max(1, int(query.get("offset", 1)))
+            limit = min(MAX_PAGE_SIZE, int(query.get("limit", MAX_PAGE_SIZE)))
+            return self._reply(200, {"response": fleet.list_interfaces(offset, limit)})
+        if name == "interface_count":
+            return self._reply(200, {"response": len(fleet.devices) * fleet.ports, "version": "1.0"})
+        if name == "statistics":
+            samples = fleet.statistics(match.group(1), int(query.get("startTime", 0)), int(query.get("endTime", 0)))
+            if samples is None:
+                return self._reply(404, {"error": "No statistics for interface"})
+            return self._reply(200, {"response": samples})
+
+        index = fleet.device(match.group(1))
+        if index is None:
+            return self._reply(404, {"error": "Device not found"})
+        if name == "equipment":
+            equipment = fleet.equipment(index)
+            if equipment is None:
+                return self._reply(400, {"error": "Not supported for this device family"})
+            return self._reply(200, {"response": equipment})
+        payload = fleet.interfaces(index) if name == "interfaces" else fleet.errors(index)
+        return self._reply(200, {"response": payload})
+
+
+class SimulatorServer(ThreadingHTTPServer):
+    """
+    Local stand-in for a Catalyst Center controller.
+
+    Point a CatalystClient at server.url. Requests and response bytes are
+    counted per status code and available from stats().
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, fleet, host=HOST, port=PORT, latency=LATENCY, jitter=JITTER,
+                 rate_limit=RATE_LIMIT, error_rate=ERROR_RATE, token_ttl=TOKEN_TTL):
+        super().__init__((host, port), Handler)
+        self.fleet = fleet
+        self.latency = latency
+        self.jitter = jitter
+        self.limiter = RateLimiter(rate_limit)
+        self.error_rate = error_rate
+        self.token_ttl = token_ttl
+        self._tokens = {}
+        self._statuses = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def issue_token(self):
+        token = uuid.uuid4().hex
+        with self._lock:
+            self._tokens[token] = time.monotonic() + self.token_ttl
+        return token
+
+    def check_token(self, token):
+        with self._lock:
+            expiry = self._tokens.get(token)
+        return expiry is not None and time.monotonic() < expiry
+
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections is normal, not worth a traceback
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+    def count(self, status, size):
+        with self._lock:
+            self._statuses[status] = self._statuses.get(status, 0) + 1
+            self._bytes += size
+
+    def stats(self):
+        with self._lock:
+            return {"requests": sum(self._statuses.values()), "bytes": self._bytes, "statuses": dict(self._statuses)}
+
+    def start(self):
+        """
+        Serves from a background thread and returns self.
+        """
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run a local Catalyst Center simulator with a synthetic fleet.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT, help=f"listen port (default {PORT}, 0 = any free port)")
+    parser.add_argument("--devices", type=int, default=DEVICES, help=f"fleet size (default {DEVICES})")
+    parser.add_argument("--ports", type=int, default=PORTS_PER_DEVICE,
+                        help=f"interfaces per device (default {PORTS_PER_DEVICE})")
+    parser.add_argument("--sites", type=int, default=SITES, help=f"number of sites (default {SITES})")
+    parser.add_argument("--seed", type=int, default=SEED, help="fleet seed; same seed, same fleet")
+    parser.add_argument("--latency", type=float, default=LATENCY, help="fixed delay per request in seconds")
+    parser.add_argument("--jitter", type=float, default=JITTER, help="extra random delay of up to this many seconds")
+    parser.add_argument("--rate-limit", type=float, default=RATE_LIMIT,
+                        help="requests per second before answering 429 (default: unlimited)")
+    parser.add_argument("--error-rate", type=float, default=ERROR_RATE,
+                        help="share of API requests answered with a 5xx (e.g. 0.01)")
+    parser.add_argument("--token-ttl", type=float, default=TOKEN_TTL,
+                        help=f"seconds until issued tokens are rejected with 401 (default {TOKEN_TTL})")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    fleet = Fleet(args.devices, args.ports, args.sites, args.seed)
+    server = SimulatorServer(
+        fleet, args.host, args.port, latency=args.latency, jitter=args.jitter,
+        rate_limit=args.rate_limit, error_rate=args.error_rate, token_ttl=args.token_ttl
+    )
+    print(f"Simulating {args.devices} devices at {server.url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served {server.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+
+from counter_store import counter_delta
+
+SNAPSHOT_PATH = os.environ.get(
+    "CATALYST_SNAPSHOTS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots.sqlite3")
+)
+
+# Fields compared per endpoint; anything else in a record may change freely
+WATCHED = {
+    "interfaces": ("status", "adminStatus", "speed", "duplex"),
+    "errors": ("crcErrors",),
+}
+EVENT_KINDS = {
+    "status": "oper",
+    "adminStatus": "admin",
+    "speed": "speed",
+    "duplex": "duplex",
+    "crcErrors": "crc",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    device_id TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    hash INTEGER NOT NULL,
+    PRIMARY KEY (device_id, endpoint)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS records (
+    device_id TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    key TEXT NOT NULL,
+    hash INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (device_id, endpoint, key)
+) WITHOUT ROWID;
+"""
+
+ChangeEvent = namedtuple("ChangeEvent", "device_id endpoint port kind old new")
+
+
+def _digest(text):
+    # Stable across processes (unlike hash()), and fits a signed SQLite INTEGER
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "big", signed=True)
+
+
+def record_hash(values):
+    return _digest(json.dumps(values, separators=(",", ":")))
+
+
+class SnapshotDiff:
+    """
+    Persistent last-seen state of interface and error records, used to
+    turn each new poll into change events.
+
+    Every record is reduced to its watched fields and hashed, and the
+    device snapshot as a whole gets a hash of its record hashes. If the
+    snapshot hash is unchanged nothing else is read or written; otherwise
+    only records whose hash differs are compared field by field and
+    written back. The first poll of a device records a baseline and
+    emits no events.
+    """
+
+    def __init__(self, path=SNAPSHOT_PATH):
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._snapshots = {}
+
+    def _snapshot_hash(self, device_id, endpoint):
+        key = (device_id, endpoint)
+        if key not in self._snapshots:
+            row = self.db.execute(
+                "SELECT hash FROM snapshots WHERE device_id = ? AND endpoint = ?", key
+            ).fetchone()
+            self._snapshots[key] = row and row[0]
+        return self._snapshots[key]
+
+    def update(self, device_id, endpoint, records):
+        """
+        Compares one poll of get_interface_stats() ("interfaces") or
+        get_interface_errors() ("errors") output with the previous one and
+        returns the list of ChangeEvents.
+        """
+        fields = WATCHED[endpoint]
+        current = {}
+        for record in records or []:
+            port = record.get("portName")
+            if port:
+                values = [record.get(field) for field in fields]
+                current[port] = (record_hash(values), values)
+        snapshot = _digest(",".join(f"{port}={current[port][0]}" for port in sorted(current)))
+
+        with self._lock:
+            previous_snapshot = self._snapshot_hash(device_id, endpoint)
+            if previous_snapshot == snapshot:
+                return []
+            previous = {
+                port: (hash_, json.loads(data))
+                for port, hash_, data in self.db.execute(
+                    "SELECT key, hash, data FROM records WHERE device_id = ? AND endpoint = ?",
+                    (device_id, endpoint)
+                )
+            }
+            events, changed = [], []
+            for port, (hash_, values) in current.items():
+                old = previous.pop(port, None)
+                if old is not None and old[0] == hash_:
+                    continue
+                changed.append((device_id, endpoint, port, hash_, json.dumps(values)))
+                if previous_snapshot is None:
+                    continue
+                if old is None:
+                    events.append(ChangeEvent(device_id, endpoint, port, "added", None, None))
+                    continue
+                for field, old_value, new_value in zip(fields, old[1], values):
+                    if old_value == new_value:
+                        continue
+                    if field == "crcErrors" and not counter_delta(old_value or 0, new_value or 0):
+                        continue
+                    events.append(ChangeEvent(device_id, endpoint, port, EVENT_KINDS[field], old_value, new_value))
+            if previous_snapshot is not None:
+                events.extend(ChangeEvent(device_id, endpoint, port, "removed", None, None) for port in previous)
+
+            with self.db:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO records (device_id, endpoint, key, hash, data) VALUES (?, ?, ?, ?, ?)",
+                    changed
+                )
+                self.db.executemany(
+                    "DELETE FROM records WHERE device_id = ? AND endpoint = ? AND key = ?",
+                    [(device_id, endpoint, port) for port in previous]
+                )
+                self.db.execute(
+                    "INSERT OR REPLACE INTO snapshots (device_id, endpoint, hash) VALUES (?, ?, ?)",
+                    (device_id, endpoint, snapshot)
+                )
+            self._snapshots[(device_id, endpoint)] = snapshot
+        return events
+
+    def close(self):
+        self.db.close()
+
+
+def format_event(event, device_name=None):
+    name = device_name or event.device_id
+    if event.kind == "crc":
+        increment = counter_delta(event.old or 0, event.new or 0)
+        return f"{name} {event.port}: +{increment} CRC errors ({event.new} total)"
+    if event.kind in ("added", "removed"):
+        return f"{name} {event.port}: interface {event.kind}"
+    return f"{name} {event.port}: {event.kind} {event.old} -> {event.new}"
+
+
+def print_events(events, device_name=None):
+    for event in events:
+        print(format_event(event, device_name))
@@ -1,67 +1,53 @@
+import os
+import argparse
 import requests
-from requests.auth import HTTPBasicAuth
-import urllib3
-
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+from catalyst_client import CatalystClient, POOL_SIZE
+from inventory import get_device_index
+from inventory_cache import InventoryCache
+from records import InterfaceRecord
+from snapshot_diff import SnapshotDiff, print_events
 
 # Replace these with your own Cisco DNA Center credentials and URL
 USERNAME = 'devnetuser'
 PASSWORD = 'Cisco123!'
-BASE_URL = 'https://sandboxdnac2.cisco.com'
+# CATALYST_URL points the script elsewhere, e.g. at the local simulator.py
+BASE_URL = os.environ.get("CATALYST_URL", 'https://sandboxdnac2.cisco.com')
 
-def get_token():
+def get_client(pool_size=POOL_SIZE):
     """
-    Authenticates with Cisco DNA Center and retrieves an authentication token.
+    Creates the shared Cisco DNA Center client (pooled session, cached token).
     """
-    url = f"{BASE_URL}/dna/system/api/v1/auth/token"
-    headers = {
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
-    response = requests.post(url, auth=HTTPBasicAuth(USERNAME, PASSWORD), headers=headers, verify=False)
-    response.raise_for_status()
-    token = response.json()["Token"]
-    return token
+    client = CatalystClient(BASE_URL, USERNAME, PASSWORD, pool_size=pool_size)
+    client.get_token()
+    return client
 
-def get_device_id(device_name, token):
+def get_device_id(device_name, client):
     """
     Fetches the device ID based on the device name.
     """
-    url = f"{BASE_URL}/dna/intent/api/v1/network-device"
-    headers = {
-        "Content-Type": "application/json",
-        "X-Auth-Token": token
-    }
-    response = requests.get(url, headers=headers, verify=False)
-    response.raise_for_status()
-
-    devices = response.json()["response"]
-    for device in devices:
-        if device["hostname"] == device_name:
-            return device["id"]
-    return None
+    return get_device_index(client).resolve(device_name)
 
-def get_interface_stats(device_id, token):
+def get_interface_stats(device_id, client):
     """
     Fetches interface details for a given device ID.
     """
-    url = f"{BASE_URL}/dna/intent/api/v1/interface/network-device/{device_id}"
-    headers = {
-        "Content-Type": "application/json",
-        "X-Auth-Token": token
-    }
-    response = requests.get(url, headers=headers, verify=False)
-    response.raise_for_status()
+    return client.get_records(f"/dna/intent/api/v1/interface/network-device/{device_id}", record=InterfaceRecord)
 
-    interfaces = response.json()["response"]
-    return interfaces
+def parse_args():
+    parser = argparse.ArgumentParser(description="Show the interfaces of one device.")
+    parser.add_argument("--changes", action="store_true",
+                        help="only print what changed since the previous run (status, admin status, speed, duplex)")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
     device_name = "switch2.ciscotest.com"  # Update this as necessary
-    token = get_token()
+    client = get_client()
     print("Token fetched successfully.")
     
-    device_id = get_device_id(device_name, token)
+    cache = InventoryCache()
+    get_device_index(client).build(cache.sync_devices(client))
+    device_id = get_device_id(device_name, client)
     if device_id:
         print(f"Device ID for '{device_name}' found: {device_id}")
     else:
@@ -69,7 +55,13 @@ def main():
         return
 
     try:
-        interfaces = get_interface_stats(device_id, token)
+        # Live fetch: cached interfaces would hide status, admin, speed and duplex changes
+        interfaces = get_interface_stats(device_id, client)
+        if args.changes:
+            events = SnapshotDiff().update(device_id, "interfaces", interfaces)
+            print(f"{len(events)} interface change(s) on '{device_name}' since the last run.")
+            print_events(events, device_name)
+            return
         print(f"Interfaces for device '{device_name}':")
         for interface in interfaces:
             print("\n--- Interface Information ---")
@@ -1,63 +1,38 @@
+import os
+import argparse
 import requests
-from requests.auth import HTTPBasicAuth
-import urllib3
-import matplotlib.pyplot as plt
-from tabulate import tabulate
-
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+from catalyst_client import CatalystClient, POOL_SIZE
+from counter_store import CounterStore, RATE_WINDOW
+from records import InterfaceRecord, ErrorRecord
+from inventory import get_device_index
+from snapshot_diff import SnapshotDiff, print_events
 
 #fråga teamet om detta. kan man få testa här, sen att återskapa ett error. 
 USERNAME = 'devnetuser'
 PASSWORD = 'Cisco123!'
-BASE_URL = 'https://sandboxdnac2.cisco.com'
-
-def get_token():
-    url = f"{BASE_URL}/dna/system/api/v1/auth/token"
-    headers = {
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
-    response = requests.post(url, auth=HTTPBasicAuth(USERNAME, PASSWORD), headers=headers, verify=False)
-    response.raise_for_status()
-    return response.json()["Token"]
-
-def get_device_id(device_name, token):
-    url = f"{BASE_URL}/dna/intent/api/v1/network-device"
-    headers = {
-        "Content-Type": "application/json",
-        "X-Auth-Token": token
-    }
-    response = requests.get(url, headers=headers, verify=False)
-    response.raise_for_status()
-    devices = response.json()["response"]
-    for device in devices:
-        if device["hostname"] == device_name:
-            return device["id"]
-    return None
-
-def get_interface_stats(device_id, token):
-    url = f"{BASE_URL}/dna/intent/api/v1/interface/network-device/{device_id}"
-    headers = {
-        "Content-Type": "application/json",
-        "X-Auth-Token": token
-    }
-    response = requests.get(url, headers=headers, verify=False)
-    response.raise_for_status()
-    return response.json()["response"]
-
-def get_interface_errors(device_id, token):
-    url = f"{BASE_URL}/dna/intent/api/v1/interface/network-device/{device_id}/errors"
-    headers = {
-        "Content-Type": "application/json",
-        "X-Auth-Token": token
-    }
-    response = requests.get(url, headers=headers, verify=False)
-    
-    if response.status_code == 200:
-        return response.json()["response"]
-    else:
+# CATALYST_URL points the script elsewhere, e.g. at the local simulator.py
+BASE_URL = os.environ.get("CATALYST_URL", 'https://sandboxdnac2.cisco.com')
+
+def get_client(pool_size=POOL_SIZE):
+    """
+    Creates the shared Cisco DNA Center client (pooled session, cached token).
+    """
+    client = CatalystClient(BASE_URL, USERNAME, PASSWORD, pool_size=pool_size)
+    client.get_token()
+    return client
+
+def get_device_id(device_name, client):
+    return get_device_index(client).resolve(device_name)
+
+def get_interface_stats(device_id, client):
+    return client.get_records(f"/dna/intent/api/v1/interface/network-device/{device_id}", record=InterfaceRecord)
+
+def get_interface_errors(device_id, client):
+    try:
+        return client.get_records(f"/dna/intent/api/v1/interface/network-device/{device_id}/errors", record=ErrorRecord)
+    except requests.exceptions.HTTPError:
         print("Failed to retrieve interface error statistics.")
-        response.raise_for_status()
+        raise
 
 def display_top_crc_errors(errors_data, top_n=10):
     crc_errors = [
@@ -76,20 +51,38 @@ def display_top_crc_errors(errors_data, top_n=10):
 
     return [interface["portName"] for interface in crc_errors_sorted[:top_n]], [interface["crcErrors"] for interface in crc_errors_sorted[:top_n]]
 
-def plot_crc_errors(port_names, crc_counts):
+def display_top_crc_rates(store, device_id, top_n=10):
+    """
+    Ranks a device's interfaces by their recent CRC error rate from the
+    counter store. Returns None until the device has been polled twice.
+    """
+    rates = store.top_rates(top_n, device_id=device_id)
+    if rates is None:
+        return None
+
+    print(f"\nTop {top_n} Interfaces by CRC Error Rate (last {RATE_WINDOW // 3600}h):")
+    for _, port_name, delta, rate in rates:
+        print(f"Interface {port_name}: {rate:.1f} CRC errors/h ({delta} new)")
+
+    return [row[1] for row in rates], [row[3] for row in rates]
+
+def plot_crc_errors(port_names, crc_counts, ylabel='CRC Error Count'):
     if not port_names:
         print("No CRC errors to plot.")
         return
+    # Imported on first use: matplotlib dominates startup time otherwise
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 5))
     plt.bar(port_names, crc_counts, color='blue')
     plt.xlabel('Interface Port Names')
-    plt.ylabel('CRC Error Count')
+    plt.ylabel(ylabel)
     plt.title('Top 10 Interfaces with CRC Errors')
     plt.xticks(rotation=45)
     plt.tight_layout()
     plt.show()
 
 def print_interfaces_table(interfaces):
+    from tabulate import tabulate
     table = []
     headers = ["Port Name", "Status", "Admin Status", "MAC Address", "Speed", "Duplex", "MTU", "VLAN ID", "IP Address", "IP Mask"]
     for interface in interfaces:
@@ -108,12 +101,19 @@ def print_interfaces_table(interfaces):
         table.append(row)
     print(tabulate(table, headers, tablefmt="grid"))
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Interface table and CRC error ranking for one device.")
+    parser.add_argument("--changes", action="store_true",
+                        help="only print interface state changes and new CRC errors since the previous run")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     device_name = "switch2.ciscotest.com"
-    token = get_token()
+    client = get_client()
     print("Token fetched successfully.")
     
-    device_id = get_device_id(device_name, token)
+    device_id = get_device_id(device_name, client)
     if device_id:
         print(f"Device ID for '{device_name}' found: {device_id}")
     else:
@@ -121,15 +121,28 @@ def main():
         return
 
     try:
-        interfaces = get_interface_stats(device_id, token)
+        interfaces = get_interface_stats(device_id, client)
+        if args.changes:
+            errors_data = get_interface_errors(device_id, client)
+            CounterStore().record_poll(device_id, errors_data)
+            diff = SnapshotDiff()
+            events = diff.update(device_id, "interfaces", interfaces) + diff.update(device_id, "errors", errors_data)
+            print(f"{len(events)} change(s) on '{device_name}' since the last run.")
+            print_events(events, device_name)
+            return
         print("Interfaces for device:")
         print_interfaces_table(interfaces)
         
-        errors_data = get_interface_errors(device_id, token)
-        port_names, crc_counts = display_top_crc_errors(errors_data)
-        
-        if port_names:
-            plot_crc_errors(port_names, crc_counts)
+        errors_data = get_interface_errors(device_id, client)
+        store = CounterStore()
+        store.record_poll(device_id, errors_data)
+        ranking = display_top_crc_rates(store, device_id)
+        if ranking is None:
+            port_names, crc_counts = display_top_crc_errors(errors_data)
+            if port_names:
+                plot_crc_errors(port_names, crc_counts)
+        elif ranking[0]:
+            plot_crc_errors(*ranking, ylabel='CRC Errors per Hour')
     except requests.exceptions.HTTPError as http_err:
         print(f"HTTP error occurred: {http_err}")
 
@@ -1,124 +1,81 @@
+import os
 import requests
-from requests.auth import HTTPBasicAuth
-import urllib3
-import matplotlib.pyplot as plt
-from tabulate import tabulate
-from datetime import datetime, timedelta
-
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+from catalyst_client import CatalystClient, POOL_SIZE
+from counter_store import CounterStore, RATE_WINDOW
+from records import InterfaceRecord, ErrorRecord
+from inventory import iter_devices, get_device_index
+from inventory_cache import InventoryCache
+from usage_history import get_usage_history
 
 # Replace these with your own Cisco DNA Center credentials and URL
 USERNAME = 'devnetuser'
 PASSWORD = 'Cisco123!'
-BASE_URL = 'https://sandboxdnac2.cisco.com'
+# CATALYST_URL points the script elsewhere, e.g. at the local simulator.py
+BASE_URL = os.environ.get("CATALYST_URL", 'https://sandboxdnac2.cisco.com')
 
-def get_token():
+def get_client(pool_size=POOL_SIZE):
     """
-    Authenticates with Cisco DNA Center and retrieves an authentication token.
+    Creates the shared Cisco DNA Center client (pooled session, cached token).
     """
-    url = f"{BASE_URL}/dna/system/api/v1/auth/token"
-    headers = {
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
-    response = requests.post(url, auth=HTTPBasicAuth(USERNAME, PASSWORD), headers=headers, verify=False)
-    response.raise_for_status()
-    token = response.json()["Token"]
-    return token
+    client = CatalystClient(BASE_URL, USERNAME, PASSWORD, pool_size=pool_size)
+    client.get_token()
+    return client
 
-def get_device_id(device_name, token):
+def get_device_id(device_name, client):
     """
     Fetches the device ID based on the device name.
     """
-    url = f"{BASE_URL}/dna/intent/api/v1/network-device"
-    headers = {
-        "Content-Type": "application/json",
-        "X-Auth-Token": token
-    }
-    response = requests.get(url, headers=headers, verify=False)
-    response.raise_for_status()
+    return get_device_index(client).resolve(device_name)
 
-    devices = response.json()["response"]
-    for device in devices:
-        if device["hostname"] == device_name:
-            return device["id"]
-    return None
+def fetch_device_equipment(device_id, client):
+    """
+    Fetches equipment details for a device, None if the device does not
+    support the endpoint (400).
+    """
+    return client.get_records(f"/dna/intent/api/v1/network-device/{device_id}/equipment", missing=(400,))
 
-def get_device_equipment(device_id, token):
+def get_device_equipment(device_id, client, cache=None):
     """
-    Fetches equipment details for a specific device by ID.
+    Fetches equipment details for a specific device by ID. With a cache the
+    controller is only asked after the device changed.
     """
-    url = f"{BASE_URL}/dna/intent/api/v1/network-device/{device_id}/equipment"
-    headers = {
-        "Content-Type": "application/json",
-        "X-Auth-Token": token
-    }
-    
     try:
-        response = requests.get(url, headers=headers, verify=False)
-        response.raise_for_status()
-        
-        # If request is successful, return the equipment details
-        equipment_details = response.json()["response"]
-        return equipment_details
-    
-    except requests.exceptions.HTTPError as http_err:
-        if response.status_code == 400:
-            print("This endpoint is not supported or lacks data in the sandbox environment.")
-            return None
+        if cache is None:
+            equipment_details = fetch_device_equipment(device_id, client)
         else:
-            print(f"HTTP error occurred: {http_err}")
-            return None
+            equipment_details = cache.get_equipment(device_id, lambda device_id: fetch_device_equipment(device_id, client))
+    except requests.exceptions.HTTPError as http_err:
+        print(f"HTTP error occurred: {http_err}")
+        return None
     except Exception as err:
         print(f"An error occurred: {err}")
         return None
 
+    if equipment_details is None:
+        print("This endpoint is not supported or lacks data in the sandbox environment.")
+    return equipment_details
+
 #new function, gets all the devices instead of just one hehe. 
-def get_all_devices(token):
+def get_all_devices(client, cache=None):
     """
     Fetches all device IDs and hostnames in the DNA Center.
     """
-    url = f"{BASE_URL}/dna/intent/api/v1/network-device"
-    headers = {
-        "Content-Type": "application/json",
-        "X-Auth-Token": token
-    }
-    response = requests.get(url, headers=headers, verify=False)
-    response.raise_for_status()
-
-    devices = response.json()["response"]
+    devices = iter_devices(client) if cache is None else cache.sync_devices(client)
     return [(device["id"], device["hostname"]) for device in devices]
 
 #jobbar här.
-def get_interface_stats(device_id, token):
+def get_interface_stats(device_id, client):
     """
     Fetches interface details for a given device ID.
     """
-    url = f"{BASE_URL}/dna/intent/api/v1/interface/network-device/{device_id}"
-    headers = {
-        "Content-Type": "application/json",
-        "X-Auth-Token": token
-    }
-    response = requests.get(url, headers=headers, verify=False)
-    response.raise_for_status()
+    return client.get_records(f"/dna/intent/api/v1/interface/network-device/{device_id}", record=InterfaceRecord)
 
-    interfaces = response.json()["response"]
-    return interfaces
-
-def get_interface_errors(device_id, token):
-    url = f"{BASE_URL}/dna/intent/api/v1/interface/network-device/{device_id}/errors"
-    headers = {
-        "Content-Type": "application/json",
-        "X-Auth-Token": token
-    }
-    response = requests.get(url, headers=headers, verify=False)
-    
-    if response.status_code == 200:
-        return response.json()["response"]
-    #return response.json().get("response", [])
-    else:
+def get_interface_errors(device_id, client):
+    try:
+        return client.get_records(f"/dna/intent/api/v1/interface/network-device/{device_id}/errors", record=ErrorRecord)
+    except requests.exceptions.HTTPError:
         print("Failed to retrieve interface error statistics.")
-        response.raise_for_status()
+        raise
 
 def display_top_crc_errors(errors_data, top_n=10):
     # Filter out interfaces with CRC errors
@@ -141,19 +98,37 @@ def display_top_crc_errors(errors_data, top_n=10):
 
     return [interface["portName"] for interface in crc_errors_sorted[:top_n]], [interface["crcErrors"] for interface in crc_errors_sorted[:top_n]]
 
-def plot_crc_errors(port_names, crc_counts):
+def display_top_crc_rates(store, device_id, top_n=10):
+    """
+    Ranks a device's interfaces by their recent CRC error rate from the
+    counter store. Returns None until the device has been polled twice.
+    """
+    rates = store.top_rates(top_n, device_id=device_id)
+    if rates is None:
+        return None
+
+    print(f"\nTop {top_n} Interfaces by CRC Error Rate (last {RATE_WINDOW // 3600}h):")
+    for _, port_name, delta, rate in rates:
+        print(f"Interface {port_name}: {rate:.1f} CRC errors/h ({delta} new)")
+
+    return [row[1] for row in rates], [row[3] for row in rates]
+
+def plot_crc_errors(port_names, crc_counts, ylabel='CRC Error Count'):
     if not port_names:
         print("No CRC errors to plot.")
         return
+    # Imported on first use: matplotlib dominates startup time otherwise
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 5))
     plt.bar(port_names, crc_counts, color='blue')
     plt.xlabel('Interface Port Names')
-    plt.ylabel('CRC Error Count')
+    plt.ylabel(ylabel)
     plt.title('Top 10 Interfaces with CRC Errors')
     plt.xticks(rotation=45)
     plt.tight_layout()
     plt.show()
 def print_interfaces_table(interfaces):
+    from tabulate import tabulate
     table = []
     headers = ["Port Name", "Status", "Admin Status", "MAC Address", "Speed", "Duplex", "MTU", "VLAN ID", "IP Address", "IP Mask"]
     for interface in interfaces:
@@ -174,40 +149,26 @@ def print_interfaces_table(interfaces):
 
 
 
-def get_interface_usage(device_id, interface_id, token):
-    #test of fake data:
-
-    # Set the date range to the last 30 days
-    end_time = datetime.utcnow()
-    start_time = end_time - timedelta(days=30)    
-    url = f"{BASE_URL}/dna/intent/api/v1/interface/{interface_id}/statistics"
-    headers = {
-        "Content-Type": "application/json",
-        "X-Auth-Token": token
-    }
-
-    params = {
-        "startTime": int(start_time.timestamp() * 1000),  # Convert to milliseconds
-        "endTime": int(end_time.timestamp() * 1000)
-    }
-    
-    response = requests.get(url, headers=headers, params=params, verify=False)
-    
-    if response.status_code == 200:
-        return response.json()["response"]
-    elif response.status_code == 404:
-        print(f"No usage data available for interface {interface_id}. It may be unsupported in the lab environment.")
-        return None
-    else:
-        print("Failed to retrieve interface usage statistics.")
+def get_interface_usage(device_id, interface_id, client):
+    """
+    Returns the last 30 days of usage samples for an interface. History is
+    fetched in daily windows in parallel and cached on disk, so only windows
+    that are new since the last run go to the controller.
+    """
+    try:
+        return get_usage_history(client).fetch(interface_id)
+    except requests.exceptions.HTTPError as http_err:
+        print(f"Failed to retrieve interface usage statistics: {http_err}")
         return None
 
 def main():
    # device_name = "switch2.ciscotest.com"  # Update this as necessary
-    token = get_token()
+    client = get_client()
     print("Token fetched successfully.")
     
-    devices = get_all_devices(token)
+    cache = InventoryCache()
+    store = CounterStore()
+    devices = get_all_devices(client, cache)
     if not devices:
         print("No devices found.")
         return
@@ -216,12 +177,12 @@ def main():
         print(f"\n--- Processing device '{device_name}' ---")
         try:
             # Fetch and display interface details
-            interfaces = get_interface_stats(device_id, token)
+            interfaces = get_interface_stats(device_id, client)
             print(f"Interfaces for device '{device_name}':")
             print_interfaces_table(interfaces)
             
             # Fetch and display equipment details
-            equipment_details = get_device_equipment(device_id, token)
+            equipment_details = get_device_equipment(device_id, client, cache)
             if equipment_details:
                 print("\n--- Equipment Details ---")
                 for equipment in equipment_details:
@@ -239,18 +200,22 @@ def main():
                 print("No equipment details found.")
             
             # CRC error check and plot
-            errors_data = get_interface_errors(device_id, token)
-            port_names, crc_counts = display_top_crc_errors(errors_data)
-            plot_crc_errors(port_names, crc_counts)
-
-            # Interface usage check
-            for interface in interfaces:
-                port_name = interface.get("portName", "N/A")
-                usage_stats = get_interface_usage_stats(device_id, port_name, token)
-                if usage_stats:
-                    display_interface_usage(usage_stats, port_name)
-                else:
-                    print(f"Could not retrieve usage data for port {port_name}")
+            errors_data = get_interface_errors(device_id, client)
+            store.record_poll(device_id, errors_data)
+            ranking = display_top_crc_rates(store, device_id)
+            if ranking is None:
+                port_names, crc_counts = display_top_crc_errors(errors_data)
+                plot_crc_errors(port_names, crc_counts)
+            else:
+                plot_crc_errors(*ranking, ylabel='CRC Errors per Hour')
+
+            # Interface usage check over the last 30 days (NumPy is loaded only here)
+            from port_usage import build_usage_matrix, analyze_usage, print_port_usage
+            usage = [
+                (interface.get("portName", "N/A"), get_interface_usage(device_id, interface["id"], client))
+                for interface in interfaces
+            ]
+            print_port_usage(analyze_usage(build_usage_matrix(usage)))
         
         except requests.exceptions.HTTPError as http_err:
             print(f"HTTP error occurred: {http_err}")
@@ -0,0 +1,166 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+USAGE_PATH = os.environ.get(
+    "CATALYST_USAGE_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "usage_history.sqlite3")
+)
+STATISTICS_PATH = "/dna/intent/api/v1/interface/{interface_id}/statistics"
+# History is fetched and cached in fixed, UTC-aligned windows
+WINDOW_SECONDS = 24 * 60 * 60
+HISTORY_DAYS = 30
+# A window is cached only once it ended this long ago, so the controller's
+# aggregation has caught up with it
+SETTLE_SECONDS = 2 * 60 * 60
+FETCH_WORKERS = 8
+# Sample field holding the epoch timestamp in milliseconds
+TIME_FIELD = "timestamp"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS windows (
+    interface_id TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (interface_id, start)
+) WITHOUT ROWID;
+"""
+
+
+class UsageHistory:
+    """
+    Interface statistics history cached in fixed time windows.
+
+    Every window that ended at least settle seconds ago is cached on disk
+    per interface. Each run of consecutive missing windows is fetched with
+    one request and split into windows locally, so a cold run costs one
+    request per interface and a later run one request for the windows that
+    ended or settled since plus the still open current window. Failed
+    fetches and interfaces without statistics are never cached.
+    """
+
+    def __init__(self, client, path=USAGE_PATH, window=WINDOW_SECONDS, workers=FETCH_WORKERS,
+                 settle=SETTLE_SECONDS):
+        self.client = client
+        self.window = window
+        self.settle = settle
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def fetch_range(self, interface_id, start, end):
+        """
+        Fetches the samples between start and end (epoch seconds). Returns
+        None if the controller has no statistics for the interface (404),
+        raises on other errors.
+        """
+        response = self.client.get(
+            STATISTICS_PATH.format(interface_id=interface_id),
+            params={"startTime": int(start * 1000), "endTime": int(end * 1000)}
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()["response"] or []
+
+    def fetch_run(self, interface_id, run):
+        """
+        Fetches a run of consecutive windows [(start, end), ...] with one
+        request and returns {start: samples} per window, or None if the
+        controller has no statistics for the interface. Samples without a
+        timestamp go to the last window of the run.
+        """
+        first = run[0][0]
+        samples = self.fetch_range(interface_id, first, run[-1][1])
+        if samples is None:
+            return None
+        split = {start: [] for start, _ in run}
+        for sample in samples:
+            stamp = sample.get(TIME_FIELD)
+            if stamp is None:
+                split[run[-1][0]].append(sample)
+                continue
+            index = min(max(int(stamp / 1000 - first) // self.window, 0), len(run) - 1)
+            split[run[index][0]].append(sample)
+        return split
+
+    def windows(self, days=HISTORY_DAYS, end_time=None):
+        """
+        Returns the [(start, end), ...] windows covering the last days,
+        the last one ending at end_time and possibly still open.
+        """
+        end_time = int(time.time() if end_time is None else end_time)
+        current = end_time - end_time % self.window
+        first = current - (int(days * 24 * 3600) // self.window) * self.window
+        return [(start, min(start + self.window, end_time)) for start in range(first, end_time, self.window)]
+
+    def fetch(self, interface_id, days=HISTORY_DAYS, end_time=None):
+        """
+        Returns the samples of the last days for one interface, fetching only
+        windows that are not cached yet.
+        """
+        end_time = int(time.time() if end_time is None else end_time)
+        windows = self.windows(days, end_time)
+        with self._lock:
+            cached = dict(self.db.execute(
+                "SELECT start, data FROM windows WHERE interface_id = ? AND start >= ?",
+                (interface_id, windows[0][0])
+            ).fetchall())
+
+        missing = [(start, end) for start, end in windows if start not in cached]
+        runs = []
+        for start, end in missing:
+            if runs and runs[-1][-1][1] == start:
+                runs[-1].append((start, end))
+            else:
+                runs.append([(start, end)])
+        fetched, cacheable = {}, set()
+        for run, split in zip(runs, self._executor.map(lambda run: self.fetch_run(interface_id, run), runs)):
+            if split is None:
+                # No statistics (404): empty for now, asked again next run
+                fetched.update((start, []) for start, _ in run)
+                continue
+            fetched.update(split)
+            cacheable.update(split)
+
+        settled = end_time - self.settle
+        closed = [
+            (interface_id, start, json.dumps(fetched[start], separators=(",", ":")))
+            for start, end in missing
+            if start in cacheable and end - start == self.window and end <= settled
+        ]
+        with self._lock, self.db:
+            self.db.executemany("INSERT OR REPLACE INTO windows (interface_id, start, data) VALUES (?, ?, ?)", closed)
+            self.db.execute(
+                "DELETE FROM windows WHERE interface_id = ? AND start < ?", (interface_id, windows[0][0])
+            )
+
+        samples = []
+        for start, _ in windows:
+            samples.extend(fetched[start] if start in fetched else json.loads(cached[start]))
+        return samples
+
+    def close(self):
+        self._executor.shutdown()
+        self.db.close()
+
+
+_histories = weakref.WeakKeyDictionary()
+_histories_lock = threading.Lock()
+
+
+def get_usage_history(client):
+    """
+    Returns the shared UsageHistory for a client, creating it on first use.
+    """
+    with _histories_lock:
+        history = _histories.get(client)
+        if history is None:
+            history = _histories[client] = UsageHistory(client)
+        return history